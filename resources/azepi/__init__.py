@@ -1,4 +1,15 @@
 """This python module implements standard Epiphany's module interface."""
 
+import importlib
+
 # Carefully decide what is going to be "public"
-from . import metadata, init, plan, apply, plan_destroy, destroy
+__all__ = ["metadata", "init", "plan", "apply", "plan_destroy", "destroy", "fleet", "serve"]
+
+
+def __getattr__(name):
+    """Import lifecycle modules lazily (i.e. "metadata" does not need yaml parsers)."""
+
+    if name in __all__:
+        return importlib.import_module("." + name, __name__)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,60 @@
+"""Thin client of the "serve" method (lifecycle methods run by a warm daemon).
+
+Kept to the standard library's socket and json modules, so it does not
+cost more than the daemon saves.
+"""
+
+import os
+import sys
+import json
+import socket
+
+
+# Methods the daemon runs (the others always run in-process)
+SERVED_METHODS = ("metadata", "init", "plan")
+
+# Seconds to wait for a response (init can take a while on big clusters)
+CLIENT_TIMEOUT = 600.0
+
+
+def request(socket_path, method, variables, *, timeout=CLIENT_TIMEOUT):
+    """Run a method in the daemon, return its response (None if no daemon is listening)."""
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    connection.settimeout(timeout)
+
+    try:
+        try:
+            connection.connect(socket_path)
+        except (FileNotFoundError, ConnectionRefusedError):
+            return None
+
+        connection.sendall(json.dumps({
+            "method": method,
+            "variables": variables,
+            "cwd": os.getcwd(),
+        }).encode("utf-8") + b"\n")
+
+        with connection.makefile("rb") as stream:
+            line = stream.readline()
+
+    finally:
+        connection.close()
+
+    if not line:
+        raise Exception(f"server {socket_path} closed the connection")
+
+    return json.loads(line)
+
+
+def replay(response):
+    """Write out the response's output, return the method's exit status."""
+
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+
+    if response["error"] is not None:
+        sys.stderr.write(response["error"])
+        return 1
+
+    return response["result"]
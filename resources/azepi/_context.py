@@ -0,0 +1,210 @@
+"""Per-invocation context shared by all lifecycle phases."""
+
+import re
+from ._documents import DocumentIndex
+from ._state import (DEFAULT_LOCK_TIMEOUT, read_state_file, update_state_file,
+                     get_section_stamps)
+from ._helpers import get_path, combine, load_yaml, iter_yaml_documents, digest_bytes
+
+
+class ModuleContext(dict):  # pylint: disable=too-many-instance-attributes
+    """Module's variables and paths with lazily loaded state and config.
+
+    Behaves like the classic "v" dictionary (variables and computed paths),
+    state and module config are parsed at most once per invocation (with the
+    fast "safe" yaml engine, they are read-only) and state updates are
+    written out in a single flush (locked, refused if the module's state
+    sections were changed concurrently).
+    """
+
+    def __init__(self, variables):
+        super().__init__(variables)
+
+        # Compute paths
+        self["shared_dir"] = get_path(self["M_SHARED"])
+
+        if "M_TEMPLATES" in self:
+            self["template_dir"] = get_path(self["M_TEMPLATES"])
+
+        self["module_dir"] = get_path(
+            str(self["shared_dir"] / self["M_MODULE_SHORT"]))
+
+        self["config_file"] = get_path(
+            str(self["module_dir"] / self["M_CONFIG_NAME"]))
+
+        self["state_file"] = get_path(
+            str(self["shared_dir"] / self["M_STATE_FILE_NAME"]))
+
+        self["backup_file"] = get_path(
+            str(self["module_dir"] / (self["M_CONFIG_NAME"] + ".backup")))
+
+        self["plan_diff_file"] = self["module_dir"] / "plan.diff"
+
+        self["plan_file"] = self["module_dir"] / "plan.json"
+
+        self["epiphany_file"] = get_path(
+            str(self["module_dir"] / "epiphany-config.yml"))
+
+        self["epicli_log_file"] = self["module_dir"] / "epicli.log"
+
+        self["build_dir"] = get_path(
+            str(self["shared_dir"] / "build" / self["M_MODULE_SHORT"]))
+
+        self["kubeconfig_file"] = self["build_dir"] / "kubeconfig"
+
+        # Metrics are picked up by the textfile collector (if pointed there),
+        # a dir shared by many environments gets a file per environment
+        if "M_METRICS_DIR" in self:
+            self["metrics_dir"] = get_path(self["M_METRICS_DIR"])
+            self["metrics_file"] = self["metrics_dir"] / "{}-{}-{}.prom".format(
+                self["M_MODULE_SHORT"],
+                re.sub(r"[^A-Za-z0-9_.]+", "-", self.environment).strip("-")[:40],
+                digest_bytes(self.environment.encode("utf-8"))[:8])
+        else:
+            self["metrics_dir"] = self["shared_dir"] / "metrics"
+            self["metrics_file"] = self["metrics_dir"] / (self["M_MODULE_SHORT"] + ".prom")
+
+        self["metrics_state_file"] = self["build_dir"] / "metrics.json"
+
+        # Precompiled templates are kept in the image (pickles are never read
+        # from the user-writable shared dir), in memory only when not set
+        if "M_TEMPLATES_CACHE" in self:
+            self["templates_cache_dir"] = get_path(self["M_TEMPLATES_CACHE"])
+        else:
+            self["templates_cache_dir"] = None
+
+        self._state_content = None
+        self._config_content = None
+        self._state = None
+        self._config = None
+        self._epiphany_documents = None
+        self._document_index = None
+        self._state_updates = []
+        self.metrics = {}
+
+    @property
+    def module_short(self):
+        """Short name of the module (and its state section)."""
+        return self["M_MODULE_SHORT"]
+
+    @property
+    def environment(self):
+        """Name of the environment (M_ENVIRONMENT, the shared dir path by default)."""
+        return self.get("M_ENVIRONMENT") or str(self["shared_dir"])
+
+    @property
+    def lock_timeout(self):
+        """Seconds to wait for the state lock."""
+        return float(self.get("M_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT))
+
+    @property
+    def state_content(self):
+        """Raw content of the state file (read once, empty if there is no state file yet)."""
+
+        if self._state_content is None:
+            self._state_content = read_state_file(self["state_file"],
+                                                  timeout=self.lock_timeout)
+
+        return self._state_content
+
+    @property
+    def state(self):
+        """Whole state document (empty if there is no state file yet)."""
+
+        if self._state is None:
+            self._state = load_yaml(self.state_content.decode("utf-8"), engine="safe") or {}
+
+        return self._state
+
+    @property
+    def module_state(self):
+        """State section of this module."""
+        return self.state[self.module_short]
+
+    def upstream(self, name):
+        """State section of another module (i.e. "azbi" or "azks")."""
+        return self.state[name]
+
+    @property
+    def config_content(self):
+        """Raw content of the module config file (read once)."""
+
+        if self._config_content is None:
+            self._config_content = self["config_file"].read_bytes()
+
+        return self._config_content
+
+    @property
+    def config(self):
+        """Whole module config document."""
+
+        if self._config is None:
+            self._config = load_yaml(self.config_content.decode("utf-8"), engine="safe")
+
+        return self._config
+
+    @property
+    def module_config(self):
+        """Config section of this module."""
+        return self.config[self.module_short]
+
+    @property
+    def epiphany_documents(self):
+        """Epiphany documents embedded in the module config."""
+
+        if self._epiphany_documents is None:
+            documents = load_yaml(self.module_config["config"], engine="safe")
+
+            # A single document is not wrapped in a list by load_yaml
+            if not isinstance(documents, list):
+                documents = [documents]
+
+            self._epiphany_documents = documents
+
+        return self._epiphany_documents
+
+    @property
+    def document_index(self):
+        """Indexed read-only view of the Epiphany documents."""
+
+        if self._document_index is None:
+            # Built while the documents are parsed (a plain copy is not kept besides it)
+            self._document_index = DocumentIndex(self.iter_epiphany_documents())
+
+        return self._document_index
+
+    def iter_epiphany_documents(self):
+        """Iterate over Epiphany documents, parse them on demand if not loaded yet."""
+
+        if self._epiphany_documents is not None:
+            return iter(self._epiphany_documents)
+
+        return iter_yaml_documents(self.module_config["config"], engine="safe")
+
+    def update_state(self, extend_by):
+        """Merge into the state, changes are written out on flush."""
+
+        self._state = combine(self.state, extend_by)
+        self._state_updates.append(extend_by)
+
+    def flush(self):
+        """Write all state updates to the state file (single write)."""
+
+        if not self._state_updates:
+            return
+
+        # Refuse to overwrite this module's section if it changed since this
+        # invocation read it (shared keys, i.e. "kind", are written by every
+        # module, stamping them would fail modules starting in parallel)
+        expected = get_section_stamps(self.state_content.decode("utf-8"),
+                                      [self.module_short])
+
+        # Only this module's sections are rewritten (in place, atomically)
+        updated = update_state_file(self["state_file"], self._state_updates,
+                                    expected=expected,
+                                    timeout=self.lock_timeout)
+
+        # Later flushes are checked against what was written here
+        self._state_content = updated.encode("utf-8")
+
+        self._state_updates.clear()
@@ -0,0 +1,356 @@
+"""Indexed (read-only) access to Epiphany's multi-document configs and compact document records."""
+
+import types
+
+
+def freeze(something):
+    """Create a deep read-only view (dictionaries become mapping proxies, lists tuples)."""
+
+    if isinstance(something, dict):
+        return types.MappingProxyType({
+            key: freeze(value)
+            for key, value in something.items()
+        })
+    if isinstance(something, list):
+        return tuple(
+            freeze(value)
+            for value in something
+        )
+    return something
+
+
+def thaw(something):
+    """Convert a read-only view back into plain (mutable) dictionaries and lists."""
+
+    if isinstance(something, types.MappingProxyType):
+        return {
+            key: thaw(value)
+            for key, value in something.items()
+        }
+    if isinstance(something, tuple):
+        return [
+            thaw(value)
+            for value in something
+        ]
+    return something
+
+
+class DocumentIndex:
+    """Hash indexes over Epiphany documents built once, queried in O(1).
+
+    Documents are indexed by "kind", "name" and ("kind", "name"),
+    "infrastructure/machine" documents additionally by hostname and ip.
+    All queries return read-only views (see "freeze" and "thaw").
+    """
+
+    def __init__(self, documents):
+        self._documents = tuple(freeze(document) for document in documents)
+
+        self._by_kind = {}
+        self._by_name = {}
+        self._by_kind_and_name = {}
+        self._machines_by_hostname = {}
+        self._machines_by_ip = {}
+
+        for document in self._documents:
+            kind = document.get("kind")
+            name = document.get("name")
+
+            self._by_kind.setdefault(kind, []).append(document)
+            self._by_name.setdefault(name, []).append(document)
+            # First document wins (consistent with "select(..., exactly=1)")
+            self._by_kind_and_name.setdefault((kind, name), document)
+
+            if kind == "infrastructure/machine":
+                specification = document.get("specification", {})
+                if "hostname" in specification:
+                    self._machines_by_hostname.setdefault(
+                        specification["hostname"], document)
+                if "ip" in specification:
+                    self._machines_by_ip.setdefault(
+                        specification["ip"], document)
+
+    def __len__(self):
+        return len(self._documents)
+
+    def __iter__(self):
+        return iter(self._documents)
+
+    def by_kind(self, kind):
+        """Return all documents of the kind."""
+        return tuple(self._by_kind.get(kind, ()))
+
+    def by_name(self, name):
+        """Return all documents with the name (of any kind)."""
+        return tuple(self._by_name.get(name, ()))
+
+    def get(self, kind, name):
+        """Return the document identified by kind and name (or None)."""
+        return self._by_kind_and_name.get((kind, name))
+
+    def first(self, kind):
+        """Return the first document of the kind (or None)."""
+        documents = self._by_kind.get(kind)
+        return documents[0] if documents else None
+
+    def machine_by_hostname(self, hostname):
+        """Return the "infrastructure/machine" document with the hostname (or None)."""
+        return self._machines_by_hostname.get(hostname)
+
+    def machine_by_ip(self, ip):
+        """Return the "infrastructure/machine" document with the ip (or None)."""
+        return self._machines_by_ip.get(ip)
+
+
+# Key orders of converted documents (documents of the same shape share one tuple)
+_KEY_ORDERS = {}
+
+# Shared "extra" of records without unknown fields (replaced on first write)
+_NO_EXTRA = types.MappingProxyType({})
+
+
+def _intern_keys(keys):
+    """Return the shared instance of a key order."""
+    return _KEY_ORDERS.setdefault(keys, keys)
+
+
+class MappingOf:  # pylint: disable=too-few-public-methods
+    """Field type of a mapping whose values are records (i.e. cluster components)."""
+
+    __slots__ = ("record_type",)
+
+    def __init__(self, record_type):
+        self.record_type = record_type
+
+
+def _from_plain(field_type, value):
+    """Convert a plain value of a typed field (values of other types are kept as is)."""
+
+    if not isinstance(value, dict):
+        return value
+
+    if isinstance(field_type, MappingOf):
+        return {
+            key: _from_plain(field_type.record_type, item)
+            for key, item in value.items()
+        }
+
+    return field_type.from_dict(value)
+
+
+def _to_plain(field_type, value):
+    """Convert a typed field's value back into plain dictionaries."""
+
+    if isinstance(value, Record):
+        return value.to_dict()
+
+    if isinstance(field_type, MappingOf) and isinstance(value, dict):
+        return {
+            key: _to_plain(field_type.record_type, item)
+            for key, item in value.items()
+        }
+
+    return value
+
+
+class Record:
+    """Compact (slots-based) form of a mapping with well-known fields.
+
+    Known fields are stored in slots, unknown ones in the "extra" mapping,
+    the original key order is kept, so "from_dict" and "to_dict" round-trip
+    losslessly. Values are not copied. Records can be read like mappings
+    and compare equal to their dictionary form.
+    """
+
+    __slots__ = ("extra", "_keys")
+
+    # Known fields (slots of subclasses), missing ones are None
+    FIELDS = ()
+
+    # Record types (or "MappingOf") of fields converted as well
+    FIELD_TYPES = {}
+
+    def __init__(self, data=None, **changes):
+        if isinstance(data, Record) and data.FIELDS is self.FIELDS:
+            # Copy of a record of the same layout, slots are copied directly
+            for field in self.FIELDS:
+                setattr(self, field, getattr(data, field))
+            self.extra = data.extra if data.extra is _NO_EXTRA else dict(data.extra)
+            keys = data.keys()
+        else:
+            data = {} if data is None else data
+            for field in self.FIELDS:
+                setattr(self, field, None)
+            self.extra = _NO_EXTRA
+            self._assign(data.items())
+            keys = _intern_keys(tuple(data))
+
+        self._assign(changes.items())
+
+        # Changing known fields (the usual case) keeps the key order
+        for key in changes:
+            if key not in keys:
+                keys = _intern_keys(keys + tuple(key for key in changes if key not in keys))
+                break
+
+        self._keys = keys
+
+    @classmethod
+    def from_dict(cls, data):
+        """Convert a mapping into the record."""
+        return cls(data)
+
+    def _assign(self, items):
+        """Store values in slots (converting typed fields) or in "extra"."""
+
+        fields, field_types = self.FIELDS, self.FIELD_TYPES
+
+        for key, value in items:
+            if key in fields:
+                if key in field_types and isinstance(value, dict):
+                    value = _from_plain(field_types[key], value)
+                setattr(self, key, value)
+            else:
+                if self.extra is _NO_EXTRA:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def to_dict(self):
+        """Convert the record back into a (plain) dictionary."""
+
+        return {
+            key: _to_plain(self.FIELD_TYPES.get(key), self[key])
+            for key in self._keys
+        }
+
+    def copy(self, **changes):
+        """Create a shallow copy with some of the fields changed (or added)."""
+        return self.__class__(self, **changes)
+
+    def keys(self):
+        """Return keys in the original order."""
+        return self._keys
+
+    def items(self):
+        """Iterate over (key, value) pairs in the original order."""
+        return ((key, self[key]) for key in self._keys)
+
+    def get(self, key, default=None):
+        """Return value of the key (or the default)."""
+        return self[key] if key in self._keys else default
+
+    def __getitem__(self, key):
+        if key not in self._keys:
+            raise KeyError(key)
+        if key in self.FIELDS:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.to_dict()!r})"
+
+
+class Document(Record):
+    """Epiphany document (any kind)."""
+
+    __slots__ = ("kind", "title", "name", "provider", "specification")
+
+    FIELDS = __slots__
+
+
+class ComponentConfig(Document):
+    """The "configuration/<component>" document (specification differs per component)."""
+
+    __slots__ = ()
+
+
+class MachineSpecification(Record):
+    """Specification of the "infrastructure/machine" document."""
+
+    __slots__ = ("hostname", "ip")
+
+    FIELDS = __slots__
+
+
+class Machine(Document):
+    """The "infrastructure/machine" document."""
+
+    __slots__ = ()
+
+    FIELD_TYPES = {"specification": MachineSpecification}
+
+
+class Component(Record):
+    """Component of the "epiphany-cluster" document."""
+
+    __slots__ = ("count", "machine", "machines", "configuration", "subnets")
+
+    FIELDS = __slots__
+
+
+class ClusterSpecification(Record):
+    """Specification of the "epiphany-cluster" document."""
+
+    __slots__ = ("name", "prefix", "admin_user", "cloud", "components")
+
+    FIELDS = __slots__
+
+    FIELD_TYPES = {"components": MappingOf(Component)}
+
+
+class EpiphanyCluster(Document):
+    """The "epiphany-cluster" document."""
+
+    __slots__ = ()
+
+    FIELD_TYPES = {"specification": ClusterSpecification}
+
+
+class FeatureMappingSpecification(Record):
+    """Specification of the "configuration/feature-mapping" document."""
+
+    __slots__ = ("available_roles", "roles_mapping")
+
+    FIELDS = __slots__
+
+
+class FeatureMapping(Document):
+    """The "configuration/feature-mapping" document."""
+
+    __slots__ = ()
+
+    FIELD_TYPES = {"specification": FeatureMappingSpecification}
+
+
+def _represent_record(representer, record):
+    """Represent a document record (nested records are represented in turn)."""
+    return representer.represent_dict(dict(record.items()))
+
+
+def register_yaml_representer(ruamel_yaml):
+    """Make round-trip dumpers write records as the mappings they stand for.
+
+    Called once, when ruamel.yaml gets imported (it is imported lazily, see
+    "_ruamel_yaml" in _helpers), the registration is global.
+    """
+
+    ruamel_yaml.representer.RoundTripRepresenter.add_multi_representer(
+        Record, _represent_record)
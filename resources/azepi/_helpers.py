@@ -1,11 +1,57 @@
 """Common helper routines."""
 
 import io
+import os
 import sys
 import copy
+import json
+import hashlib
+import datetime
+import functools
 import pathlib
+import tempfile
+import threading
 import difflib
-import ruamel.yaml
+import collections
+from ._documents import register_yaml_representer
+
+
+# Yaml engines: "rt" (round-trip, for documents that are written back and
+# must keep their formatting) and "safe" (C-based when ruamel.yaml.clib is
+# available, for read-only consumers)
+YAML_ENGINES = ("rt", "safe")
+
+# Process-wide cache of parsed yaml documents (LRU)
+YAML_CACHE_SIZE = 64
+
+_YAML_CACHE = collections.OrderedDict()
+
+_YAML_CACHE_LOCK = threading.Lock()
+
+
+def _read_umask():
+    """Return the process umask (it can only be read by setting it)."""
+
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return umask
+
+
+# Read once at import time, setting umask later would race with other threads
+_UMASK = _read_umask()
+
+
+@functools.lru_cache(maxsize=None)
+def _ruamel_yaml():
+    """Import ruamel.yaml on first use (it dominates the import time)."""
+
+    import ruamel.yaml  # pylint: disable=import-outside-toplevel
+
+    # Document records are written as the mappings they stand for
+    register_yaml_representer(ruamel.yaml)
+
+    return ruamel.yaml
 
 
 def get_path(a_str):
@@ -17,24 +63,100 @@ def get_path(a_str):
     return pathlib.Path(a_str).resolve()
 
 
+def write_atomically(path, data):
+    """Write bytes (or a string) into a file, readers see either old or new content.
+
+    Data is flushed to disk before the rename (and the rename itself after),
+    so a crash never leaves a truncated file. Permissions of an existing file
+    are preserved.
+    """
+
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        mode = path.stat().st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+
+    descriptor, temporary_name = tempfile.mkstemp(dir=str(path.parent),
+                                                  prefix=f".{path.name}.",
+                                                  suffix=".tmp")
+
+    try:
+        with os.fdopen(descriptor, "wb") as stream:
+            stream.write(data)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.chmod(temporary_name, mode)
+        os.replace(temporary_name, str(path))
+    finally:
+        if os.path.exists(temporary_name):
+            os.unlink(temporary_name)
+
+    _fsync_directory(path.parent)
+
+    # Writing to a file makes its cached parse stale
+    invalidate_yaml_cache(path)
+
+
+def write_if_changed(path, data):
+    """Write bytes (or a string) atomically unless the file already has that content.
+
+    Skipped writes keep modification times stable (for mtime-keyed caches
+    and tools syncing the shared dir). Return True if the file was written.
+    """
+
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    try:
+        # Sizes differ for most changes, content is read only if they match
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        pass
+
+    write_atomically(path, data)
+
+    return True
+
+
+def _fsync_directory(path):
+    """Make a rename in the directory durable (not supported on all platforms)."""
+
+    try:
+        descriptor = os.open(str(path), os.O_RDONLY)
+    except OSError:
+        return
+
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
 def combine(to_merge, extend_by):
-    """Merge nested dictionaries."""
+    """Merge nested dictionaries.
 
-    def _combine(to_merge, extend_by):
-        for key, value in extend_by.items():
-            if key in to_merge:
-                if isinstance(to_merge[key], dict):
-                    _combine(to_merge[key], value)
-                else:
-                    to_merge[key] = value
-            else:
-                to_merge[key] = value
+    Inputs are never mutated, only dictionaries along the paths touched by
+    "extend_by" are copied, all other subtrees are shared with the inputs
+    (treat the result as immutable or copy it before modifying in place).
+    """
 
-    to_merge = copy.deepcopy(to_merge)
+    merged = dict(to_merge)
 
-    _combine(to_merge, extend_by)
+    for key, value in extend_by.items():
+        if key in merged and isinstance(merged[key], dict) and isinstance(value, dict):
+            merged[key] = combine(merged[key], value)
+        else:
+            merged[key] = value
 
-    return to_merge
+    return merged
 
 
 def dictify(a_list, *, key_name="name"):
@@ -42,7 +164,7 @@ def dictify(a_list, *, key_name="name"):
     # Please note the "name" key is preserved in the list
     return {
         item[key_name]: item
-        for item in copy.deepcopy(a_list)
+        for item in a_list
     }
 
 
@@ -50,12 +172,16 @@ def undictify(a_dict, *, key_name="name"):
     """Convert a dictionary to a list-based dictionary."""
     return [
         combine(value, {key_name: key})
-        for key, value in copy.deepcopy(a_dict).items()
+        for key, value in a_dict.items()
     ]
 
 
 def select(a_list, query, *, exactly=0):
-    """Scan a list of dictionaries and pick ones that match the query."""
+    """Scan a list (or any iterable) of dictionaries and pick ones that match the query.
+
+    Iterables are consumed lazily, with "exactly" set scanning stops as soon
+    as enough documents are found (i.e. parsing stops for generators).
+    """
 
     documents = []
     counter = 0
@@ -84,48 +210,201 @@ def q_kind(kind):
     return lambda item: item["kind"] == kind
 
 
-def load_yaml(path_or_str):
-    """Load and parse yaml document(s)."""
-
-    # This removes all ruamel comments (TODO: fix the "combine" function)
-    def clean(something):
-        if isinstance(something, dict):
-            return dict(
-                (key, clean(value))
-                for key, value in something.items()
-            )
-        if isinstance(something, list):
-            return list(
-                clean(value)
-                for value in something
-            )
-        return copy.deepcopy(something)
-
-    yaml = ruamel.yaml.YAML()
+def _yaml_cache_key(path_or_str, engine):
+    """Compute cache key for a path (file identity) or a string (content hash)."""
+
+    if engine not in YAML_ENGINES:
+        raise ValueError(f"unknown yaml engine: {engine}")
+
+    if isinstance(path_or_str, pathlib.Path):
+        path = path_or_str.resolve()
+        # Raises FileNotFoundError for missing files (callers rely on that)
+        stat = path.stat()
+        return ("path", str(path), stat.st_mtime_ns, stat.st_size, stat.st_ino, engine)
+
+    if isinstance(path_or_str, str):
+        path_or_str = path_or_str.encode("utf-8")
+
+    if isinstance(path_or_str, bytes):
+        return ("str", hashlib.sha256(path_or_str).hexdigest(), engine)
+
+    # Streams and other objects are not cacheable
+    return None
+
+
+def invalidate_yaml_cache(path=None):
+    """Drop cached documents parsed from the path (or everything)."""
+
+    with _YAML_CACHE_LOCK:
+        if path is None:
+            _YAML_CACHE.clear()
+            return
+
+        path = str(pathlib.Path(path).resolve())
+
+        for key in list(_YAML_CACHE):
+            if key[0] == "path" and key[1] == path:
+                del _YAML_CACHE[key]
+
+
+def _get_cached_documents(key):
+    """Return cached documents (or None), mark the entry as recently used."""
+
+    with _YAML_CACHE_LOCK:
+        documents = _YAML_CACHE.get(key)
+        if documents is not None:
+            _YAML_CACHE.move_to_end(key)
+        return documents
+
+
+def _put_cached_documents(key, documents):
+    """Store documents in the cache, evict least recently used entries."""
+
+    with _YAML_CACHE_LOCK:
+        _YAML_CACHE[key] = documents
+        while len(_YAML_CACHE) > YAML_CACHE_SIZE:
+            _YAML_CACHE.popitem(last=False)
+
+
+def load_yaml(path_or_str, *, engine="rt"):
+    """Load and parse yaml document(s) (cached, returns a private copy)."""
+
+    key = _yaml_cache_key(path_or_str, engine)
+
+    cached = _get_cached_documents(key) if key is not None else None
+
+    if cached is not None:
+        loaded = copy_tree(cached)
+    else:
+        loaded = list(_parse_yaml_documents(path_or_str, engine))
+
+        if key is not None:
+            _put_cached_documents(key, loaded)
+            loaded = copy_tree(loaded)
+
+    if len(loaded) == 1:
+        return loaded[0]
+
+    return loaded
+
+
+def iter_yaml_documents(path_or_str, *, engine="rt"):
+    """Load and parse yaml documents one by one (generator).
+
+    Documents are parsed only when requested, so consumers that stop early
+    never parse (nor keep in memory) the rest of the stream.
+    """
+
+    key = _yaml_cache_key(path_or_str, engine)
+
+    cached = _get_cached_documents(key) if key is not None else None
+
+    if cached is not None:
+        for document in cached:
+            yield copy_tree(document)
+        return
+
+    yield from _parse_yaml_documents(path_or_str, engine)
+
+
+def _create_yaml(engine):
+    """Create yaml parser/emitter instance for the engine."""
+
+    if engine == "safe":
+        return _ruamel_yaml().YAML(typ="safe", pure=False)
+
+    yaml = _ruamel_yaml().YAML()
     yaml.preserve_quotes = True
     yaml.default_flow_style = False
+    yaml.Constructor = _plain_round_trip_constructor()
 
-    loaded = list(yaml.load_all(path_or_str))
+    return yaml
 
-    if len(loaded) == 1:
-        return clean(loaded[0])
 
-    return clean(loaded)
+@functools.lru_cache(maxsize=None)
+def _plain_round_trip_constructor():
+    """Create round-trip constructor that builds plain dictionaries and lists.
+
+    Scalars keep their round-trip types (quoting and literal blocks survive
+    dumping), comments are dropped, merge keys are resolved and aliases get
+    their own copies, all in the single construction pass.
+    """
+
+    constructor = _ruamel_yaml().constructor
+
+    class PlainRoundTripConstructor(constructor.RoundTripConstructor):
+        """Round-trip constructor emitting plain python containers."""
+
+        def construct_object(self, node, deep=False):
+            # Dumping shared containers would produce anchors
+            if node in self.constructed_objects:
+                return copy_tree(self.constructed_objects[node])
+            return super().construct_object(node, deep=deep)
+
+        def flatten_mapping(self, node):
+            # Merged keys are inlined the way the "safe" engine does (same key order)
+            return constructor.SafeConstructor.flatten_mapping(self, node)
+
+        def construct_yaml_seq(self, node):
+            data = []
+            yield data
+            data.extend(constructor.SafeConstructor.construct_sequence(self, node, deep=True))
+
+        def construct_yaml_map(self, node):
+            data = {}
+            yield data
+            data.update(constructor.SafeConstructor.construct_mapping(self, node, deep=True))
+
+    PlainRoundTripConstructor.add_constructor(
+        "tag:yaml.org,2002:seq", PlainRoundTripConstructor.construct_yaml_seq)
+    PlainRoundTripConstructor.add_constructor(
+        "tag:yaml.org,2002:map", PlainRoundTripConstructor.construct_yaml_map)
+
+    return PlainRoundTripConstructor
+
+
+def _parse_yaml_documents(path_or_str, engine):
+    """Parse yaml documents into plain python structures (generator)."""
+
+    # The C-based parser does not accept str subclasses (ruamel scalars)
+    if isinstance(path_or_str, str):
+        path_or_str = str(path_or_str)
+
+    yield from _create_yaml(engine).load_all(path_or_str)
+
+
+def has_yaml_references(a_str):
+    """Check if yaml text defines anchors or refers to them (aliases)."""
+
+    # Cheap check first, both are rare in module states
+    if "&" not in a_str and "*" not in a_str:
+        return False
+
+    # Aliases are node events with the anchor they refer to, so both define
+    # "anchor" (parsing only, nothing is constructed)
+    return any(
+        getattr(event, "anchor", None) is not None
+        for event in _create_yaml("safe").parse(str(a_str))
+    )
 
 
 def dump_yaml(list_or_dict, *, stream=sys.stdout):
     """Print yaml document(s)."""
 
-    yaml = ruamel.yaml.YAML()
+    yaml = _ruamel_yaml().YAML()
     yaml.preserve_quotes = True
     yaml.default_flow_style = False
     yaml.indent(mapping=2, sequence=4, offset=2)
 
     if isinstance(list_or_dict, list):
         yaml.dump_all(list_or_dict, stream)
-        return
+    else:
+        yaml.dump(list_or_dict, stream)
 
-    yaml.dump(list_or_dict, stream)
+    # Writing to a file makes its cached parse stale
+    stream_name = getattr(stream, "name", None)
+    if isinstance(stream_name, str) and not str(stream_name).startswith("<"):
+        invalidate_yaml_cache(stream_name)
 
 
 def dump_yaml_into_str(list_or_dict):
@@ -141,9 +420,35 @@ def dump_yaml_into_str(list_or_dict):
     return output
 
 
+# Immutable leaves of parsed documents (ruamel's round-trip scalars subclass them)
+_IMMUTABLE_TYPES = (str, int, float, bool, type(None), bytes, datetime.date)
+
+
+def copy_tree(something):
+    """Copy nested dictionaries and lists, share immutable scalars.
+
+    Much cheaper than "copy.deepcopy" for parsed documents (no memo, no
+    per-leaf dispatch), other objects are still deep-copied.
+    """
+
+    if isinstance(something, dict):
+        return {
+            key: copy_tree(value)
+            for key, value in something.items()
+        }
+    if isinstance(something, list):
+        return [
+            copy_tree(value)
+            for value in something
+        ]
+    if isinstance(something, _IMMUTABLE_TYPES):
+        return something
+    return copy.deepcopy(something)
+
+
 def to_literal_scalar(a_str):
     """Helper function to enforce literal scalar block (ruamel.yaml)."""
-    return ruamel.yaml.scalarstring.LiteralScalarString(a_str)
+    return _ruamel_yaml().scalarstring.LiteralScalarString(a_str)
 
 
 def sorted_dict(a_dict):
@@ -153,6 +458,96 @@ def sorted_dict(a_dict):
     )
 
 
+def tree_diff(tree_a, tree_b, *, path=()):
+    """Compute structural differences between two trees (generator).
+
+    Yields ("added" | "removed" | "changed", path, old, new) tuples, where
+    path is a tuple of keys/indices. Shared subtrees are skipped without
+    walking them. Scalars of different types are never equal (i.e. "1" and
+    "true" or "1" and "1.0").
+    """
+
+    if tree_a is tree_b:
+        return
+
+    # Containers are always walked, "==" would consider i.e. {"a": 1} and
+    # {"a": True} equal
+    if isinstance(tree_a, dict) and isinstance(tree_b, dict):
+        yield from _tree_diff_dicts(tree_a, tree_b, path)
+        return
+
+    if isinstance(tree_a, list) and isinstance(tree_b, list):
+        yield from _tree_diff_lists(tree_a, tree_b, path)
+        return
+
+    if _scalar_type(tree_a) is not _scalar_type(tree_b) or tree_a != tree_b:
+        yield "changed", path, tree_a, tree_b
+
+
+def _scalar_type(value):
+    """Return the basic type of a scalar (round-trip scalars subclass them)."""
+
+    for scalar_type in (bool, int, float, str):
+        if isinstance(value, scalar_type):
+            return scalar_type
+
+    return type(value)
+
+
+def _tree_diff_dicts(dict_a, dict_b, path):
+    for key, value in dict_a.items():
+        if key in dict_b:
+            yield from tree_diff(value, dict_b[key], path=path + (key,))
+        else:
+            yield "removed", path + (key,), value, None
+
+    for key, value in dict_b.items():
+        if key not in dict_a:
+            yield "added", path + (key,), None, value
+
+
+def _tree_diff_lists(list_a, list_b, path):
+    for index, (value_a, value_b) in enumerate(zip(list_a, list_b)):
+        yield from tree_diff(value_a, value_b, path=path + (index,))
+
+    for index in range(len(list_b), len(list_a)):
+        yield "removed", path + (index,), list_a[index], None
+
+    for index in range(len(list_a), len(list_b)):
+        yield "added", path + (index,), None, list_b[index]
+
+
+def format_path(path):
+    """Render a tree_diff path as a dotted string (i.e. "a.b[0].c")."""
+
+    output = ""
+
+    for item in path:
+        if isinstance(item, int):
+            output += f"[{item}]"
+        elif output:
+            output += "." + str(item)
+        else:
+            output = str(item)
+
+    return output
+
+
+def digest_bytes(data):
+    """Compute content digest of bytes (or a string)."""
+
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+
+    return hashlib.sha256(data).hexdigest()
+
+
+def digest_data(something):
+    """Compute content digest of a python structure (independent of key order)."""
+
+    return digest_bytes(json.dumps(something, sort_keys=True, default=str))
+
+
 def udiff(str_a, str_b, *, number_of_context_lines=0):
     """Compute unified diff of two strings."""
 
@@ -0,0 +1,212 @@
+"""Metrics of lifecycle methods (Prometheus textfile collector format).
+
+Every run rewrites "<shared dir>/metrics/<module>.prom", or a file per
+environment in M_METRICS_DIR (i.e. the collector's dir shared by many
+environments). Series are labelled with the module and the environment.
+Histograms and counters are cumulative over runs, they are persisted
+(together with last values of gauges) in the module's build dir.
+"""
+
+import sys
+import json
+import time
+import contextlib
+from ._helpers import write_atomically
+from ._state import StateLockTimeout, state_lock
+
+
+METRICS_VERSION = 2
+
+# Upper bounds of phase duration buckets (seconds), epicli runs take hours
+DURATION_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800, 3600, 7200, 14400)
+
+# Gauges replaced as a whole when set (i.e. kinds not present anymore disappear)
+REPLACED_METRICS = {"azepi_documents"}
+
+# Seconds to wait for other runs writing metrics
+METRICS_LOCK_TIMEOUT = 10.0
+
+METRICS = {
+    "azepi_phase_duration_seconds": (
+        "histogram", "Duration of lifecycle methods."),
+    "azepi_phase_runs_total": (
+        "counter", "Runs of lifecycle methods by result."),
+    "azepi_phase_last_run_timestamp_seconds": (
+        "gauge", "Start time of the last run of lifecycle methods."),
+    "azepi_epicli_duration_seconds": (
+        "gauge", "Duration of the last epicli run."),
+    "azepi_epicli_exit_code": (
+        "gauge", "Exit code of the last epicli run (-1 if it timed out)."),
+    "azepi_state_bytes": (
+        "gauge", "Size of the state file."),
+    "azepi_config_bytes": (
+        "gauge", "Size of the module config file."),
+    "azepi_documents": (
+        "gauge", "Epiphany documents in the module config by kind."),
+    "azepi_vms": (
+        "gauge", "Virtual machines in the module config."),
+    "azepi_apply_skipped": (
+        "gauge", "Whether the last apply had no changes to apply."),
+}
+
+
+def set_gauge(v, name, value, **labels):
+    """Set value of a gauge (written out at the end of the run)."""
+
+    v.metrics.setdefault(name, {})[_format_labels(v, labels)] = value
+
+
+def record_documents(v, documents):
+    """Set document counts by kind and the number of virtual machines."""
+
+    counts = {}
+    for document in documents:
+        counts[document.get("kind")] = counts.get(document.get("kind"), 0) + 1
+
+    v.metrics["azepi_documents"] = {
+        _format_labels(v, {"kind": kind}): count
+        for kind, count in counts.items()
+    }
+
+    set_gauge(v, "azepi_vms", counts.get("infrastructure/machine", 0))
+
+
+@contextlib.contextmanager
+def record_phase(v, phase):
+    """Measure a lifecycle method, write all metrics when it finishes (or fails).
+
+    Failures to write metrics are reported, they never fail the method.
+    """
+
+    started_at = time.time()
+    started = time.perf_counter()
+    result = "failure"
+
+    try:
+        yield
+        result = "success"
+    finally:
+        seconds = time.perf_counter() - started
+
+        try:
+            _write_metrics(v, phase, seconds=seconds, result=result, started_at=started_at)
+        except (OSError, ValueError, StateLockTimeout) as error:
+            print(f"unable to write metrics: {error}", file=sys.stderr)
+
+
+def _write_metrics(v, phase, *, seconds, result, started_at):
+    """Merge this run into persisted metrics, render the textfile."""
+
+    for name, path in [("azepi_state_bytes", v["state_file"]),
+                       ("azepi_config_bytes", v["config_file"])]:
+        if path.exists():
+            set_gauge(v, name, path.stat().st_size)
+
+    set_gauge(v, "azepi_phase_last_run_timestamp_seconds", started_at, phase=phase)
+
+    with state_lock(v["metrics_state_file"], exclusive=True, timeout=METRICS_LOCK_TIMEOUT):
+        metrics = _read_metrics(v["metrics_state_file"])
+
+        _observe(metrics, "azepi_phase_duration_seconds",
+                 _format_labels(v, {"phase": phase}), seconds)
+
+        runs = metrics["series"].setdefault("azepi_phase_runs_total", {})
+        labels = _format_labels(v, {"phase": phase, "result": result})
+        runs[labels] = runs.get(labels, 0) + 1
+
+        for name, series in v.metrics.items():
+            if name in REPLACED_METRICS:
+                metrics["series"][name] = series
+            else:
+                metrics["series"].setdefault(name, {}).update(series)
+
+        write_atomically(v["metrics_state_file"], json.dumps(metrics, indent=2))
+        write_atomically(v["metrics_file"], _render(metrics))
+
+
+def _read_metrics(path):
+    """Read persisted metrics (empty ones if missing, invalid or of another version)."""
+
+    try:
+        metrics = json.loads(path.read_text())
+    except (FileNotFoundError, ValueError):
+        metrics = None
+
+    if not isinstance(metrics, dict) or metrics.get("version") != METRICS_VERSION:
+        metrics = {
+            "version": METRICS_VERSION,
+            "series": {},
+            "histograms": {},
+        }
+
+    return metrics
+
+
+def _observe(metrics, name, labels, value):
+    """Add an observation to a (cumulative) histogram."""
+
+    histogram = metrics["histograms"].setdefault(name, {}).setdefault(labels, {
+        "buckets": [0] * len(DURATION_BUCKETS),
+        "sum": 0.0,
+        "count": 0,
+    })
+
+    for index, bound in enumerate(DURATION_BUCKETS):
+        if value <= bound:
+            histogram["buckets"][index] += 1
+
+    histogram["sum"] += value
+    histogram["count"] += 1
+
+
+def _render(metrics):
+    """Render metrics in the Prometheus text format."""
+
+    lines = []
+
+    for name, (kind, description) in METRICS.items():
+        series = metrics["series"].get(name, {})
+        histograms = metrics["histograms"].get(name, {})
+
+        if not series and not histograms:
+            continue
+
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {kind}")
+
+        for labels, value in sorted(series.items()):
+            lines.append(f"{name}{{{labels}}} {_format_value(value)}")
+
+        for labels, histogram in sorted(histograms.items()):
+            for bound, count in zip(DURATION_BUCKETS, histogram["buckets"]):
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}')
+            lines.append(f"{name}_sum{{{labels}}} {_format_value(histogram['sum'])}")
+            lines.append(f"{name}_count{{{labels}}} {histogram['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(v, labels):
+    """Format labels (the module and environment labels included) as in the text format."""
+
+    labels = dict(labels, module=v.module_short, environment=v.environment)
+
+    return ",".join(
+        '{}="{}"'.format(key, str(value).replace("\\", "\\\\")
+                                        .replace('"', '\\"')
+                                        .replace("\n", "\\n"))
+        for key, value in sorted(labels.items())
+    )
+
+
+def _format_value(value):
+    """Format a sample value (integers stay integers)."""
+
+    if isinstance(value, bool):
+        return str(int(value))
+
+    if isinstance(value, int):
+        return str(value)
+
+    return repr(float(value))
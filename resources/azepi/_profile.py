@@ -0,0 +1,134 @@
+"""Profiling of lifecycle methods (enabled with M_PROFILE=1 or "--profile")."""
+
+import sys
+import json
+import time
+import functools
+from ._context import ModuleContext
+from ._helpers import write_atomically
+
+
+# Number of functions in the hot-function summaries
+HOT_FUNCTIONS = 30
+
+# Attribution of (own) function time, first match wins
+CATEGORIES = [
+    ("yaml", ["ruamel"]),
+    ("copy", ["/copy.py"]),
+    ("subprocess", ["/subprocess.py", "/asyncio/", "/selectors.py", "select.", "waitpid"]),
+    ("import", ["<frozen importlib", "_imp."]),
+    ("azepi", ["/azepi/"]),
+]
+
+# Step timings of active profiling sessions (the innermost one is used)
+_SESSIONS = []
+
+
+def step(function):
+    """Mark a lifecycle method's internal step, its wall time is recorded when profiling.
+
+    Steps running in other threads are timed too (cProfile only sees the
+    main thread).
+    """
+
+    name = function.__module__.rsplit(".", 1)[-1] + "." + function.__name__
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not _SESSIONS:
+            return function(*args, **kwargs)
+
+        steps = _SESSIONS[-1]
+        started = time.perf_counter()
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            calls, seconds = steps.get(name, (0, 0.0))
+            steps[name] = (calls + 1, seconds + time.perf_counter() - started)
+
+    return wrapper
+
+
+def run_profiled(handler, variables, *, name):
+    """Run a lifecycle method handler under cProfile, save stats and a summary.
+
+    Files "<name>-<timestamp>.pstats" (for pstats, snakeviz, etc.) and
+    "<name>-<timestamp>.json" (steps, hot functions and time by category)
+    are written into the module's build dir, even if the handler fails.
+    """
+
+    # Lifecycle modules import this module for "step", keep it cheap
+    import cProfile  # pylint: disable=import-outside-toplevel
+
+    output_dir = ModuleContext(variables)["build_dir"]
+
+    steps = {}
+    profiler = cProfile.Profile()
+
+    _SESSIONS.append(steps)
+    started = time.perf_counter()
+
+    try:
+        return profiler.runcall(handler, variables)
+    finally:
+        seconds = time.perf_counter() - started
+        _SESSIONS.pop()
+
+        base_name = f"{name}-{time.strftime('%Y%m%dT%H%M%S')}"
+
+        output_dir.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(str(output_dir / (base_name + ".pstats")))
+
+        write_atomically(output_dir / (base_name + ".json"), json.dumps(
+            _summarize(profiler, name=name, seconds=seconds, steps=steps), indent=2))
+
+        print(f"profile written to {output_dir / base_name}.{{pstats,json}}", file=sys.stderr)
+
+
+def _summarize(profiler, *, name, seconds, steps):
+    """Create the JSON summary of a profiling session."""
+
+    import pstats  # pylint: disable=import-outside-toplevel
+
+    stats = pstats.Stats(profiler).stats
+
+    functions = [
+        {
+            "function": pstats.func_std_string(function),
+            "calls": calls,
+            "own_seconds": own_seconds,
+            "cumulative_seconds": cumulative_seconds,
+        }
+        for function, (_, calls, own_seconds, cumulative_seconds, _) in stats.items()
+    ]
+
+    categories = {}
+    for function in functions:
+        category = _categorize(function["function"])
+        categories[category] = categories.get(category, 0.0) + function["own_seconds"]
+
+    return {
+        "method": name,
+        "seconds": seconds,
+        "steps": {
+            step_name: {"calls": calls, "seconds": step_seconds}
+            for step_name, (calls, step_seconds) in sorted(steps.items(),
+                                                           key=lambda item: -item[1][1])
+        },
+        "categories": dict(sorted(categories.items(), key=lambda item: -item[1])),
+        "hot_functions_by_own_time": sorted(
+            functions, key=lambda item: -item["own_seconds"])[:HOT_FUNCTIONS],
+        "hot_functions_by_cumulative_time": sorted(
+            functions, key=lambda item: -item["cumulative_seconds"])[:HOT_FUNCTIONS],
+    }
+
+
+def _categorize(function):
+    """Attribute a function to a category (by its file or name)."""
+
+    for category, patterns in CATEGORIES:
+        if any(pattern in function for pattern in patterns):
+            return category
+
+    return "other"
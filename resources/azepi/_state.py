@@ -0,0 +1,267 @@
+"""Shared state file storage (per-module sections updated in place).
+
+Modules running concurrently against the same shared dir coordinate with
+advisory locks on "<state file>.lock" (shared for reads, exclusive for
+read-modify-write), lost updates are detected by comparing version stamps
+(content digests) of the touched sections.
+"""
+
+import re
+import time
+import fcntl
+import contextlib
+from ._helpers import (combine, load_yaml, dump_yaml_into_str, write_atomically,
+                       digest_data, has_yaml_references)
+
+
+# Top-level keys of the state file, as written by the modules (plain keys only)
+SECTION_KEY = re.compile(r"^([A-Za-z0-9_][A-Za-z0-9_.-]*):(?:\s|$)")
+
+# Seconds to wait for the state lock (can be set with M_LOCK_TIMEOUT)
+DEFAULT_LOCK_TIMEOUT = 60.0
+
+LOCK_POLL_INTERVAL = 0.05
+
+
+class StateLockTimeout(Exception):
+    """The state lock could not be acquired in time."""
+
+
+class StaleStateError(Exception):
+    """State sections were changed by someone else since they were read."""
+
+
+@contextlib.contextmanager
+def state_lock(path, *, exclusive=False, timeout=DEFAULT_LOCK_TIMEOUT):
+    """Hold an advisory (shared or exclusive) lock of the state file.
+
+    A separate lock file is used, the state file itself is replaced on
+    every write (locks of the replaced file would not be seen).
+    """
+
+    lock_path = path.with_name(path.name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    operation = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    deadline = time.monotonic() + timeout
+
+    with lock_path.open("a") as stream:
+        while True:
+            try:
+                fcntl.flock(stream.fileno(), operation | fcntl.LOCK_NB)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise StateLockTimeout(
+                        f"unable to lock {path} within {timeout}s") from None
+                time.sleep(LOCK_POLL_INTERVAL)
+
+        try:
+            yield
+        finally:
+            fcntl.flock(stream.fileno(), fcntl.LOCK_UN)
+
+
+def read_state_file(path, *, timeout=DEFAULT_LOCK_TIMEOUT):
+    """Read raw content of the state file under a shared lock (empty if there is none)."""
+
+    with state_lock(path, timeout=timeout):
+        try:
+            return path.read_bytes()
+        except FileNotFoundError:
+            return b""
+
+
+def get_section_stamps(text, keys):
+    """Compute version stamps of top-level sections (None for missing sections).
+
+    Stamps are digests of the parsed content, so reformatting of the file
+    (i.e. by other modules rewriting it as a whole) does not change them.
+    """
+
+    lines = text.splitlines(True)
+    sections = _find_sections(lines)
+
+    values = None
+
+    if sections is not None:
+        values = {}
+        for key in keys:
+            if key not in sections:
+                continue
+
+            section = _load_section(lines, sections, key, engine="safe")
+
+            # Sections sharing anchors are read from the whole file
+            if section is None:
+                values = None
+                break
+
+            values[key] = section[key]
+
+    if values is None:
+        state = (load_yaml(text, engine="safe") if text.strip() else None) or {}
+        values = {
+            key: state[key]
+            for key in keys
+            if key in state
+        }
+
+    return {
+        key: digest_data(values[key]) if key in values else None
+        for key in keys
+    }
+
+
+def update_state_file(path, updates, *, expected=None, timeout=DEFAULT_LOCK_TIMEOUT):
+    """Apply state updates (merged in order) to the state file, return the new content.
+
+    Only top-level sections touched by the updates are parsed and written
+    back, all other modules' sections are kept byte for byte. Files the
+    section layout cannot be recognized in are rewritten as a whole. The
+    file is replaced atomically in both cases, under the exclusive lock.
+
+    With "expected" stamps (see "get_section_stamps") the update is refused
+    if any of the sections changed in the meantime.
+    """
+
+    with state_lock(path, exclusive=True, timeout=timeout):
+        try:
+            text = path.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            text = ""
+
+        if expected is not None:
+            current = get_section_stamps(text, list(expected))
+            changed = [
+                key
+                for key, stamp in expected.items()
+                if current[key] != stamp
+            ]
+            if changed:
+                raise StaleStateError(
+                    f"state sections changed concurrently: {', '.join(changed)}")
+
+        updated = _splice_sections(text, updates)
+
+        if updated is None:
+            updated = _rewrite(text, updates)
+
+        # Updates that change nothing keep the file (and its mtime) as is
+        if updated != text:
+            write_atomically(path, updated)
+
+    return updated
+
+
+def _find_sections(lines):
+    """Map top-level keys to their (start, stop) line ranges (or None if not recognized)."""
+
+    sections = {}
+    key = None
+
+    for index, line in enumerate(lines):
+        # Indented lines and blank lines belong to the current section
+        if not line.strip() or line[0] in " \t":
+            continue
+
+        if key is not None:
+            sections[key] = (sections[key][0], index)
+            key = None
+
+        # Top-level comments do not belong to any section
+        if line.startswith("#"):
+            continue
+
+        match = SECTION_KEY.match(line)
+
+        # Document markers, flow style, quoted or duplicate keys, etc.
+        if match is None or match.group(1) in sections:
+            return None
+
+        key = match.group(1)
+        sections[key] = (index, len(lines))
+
+    return sections
+
+
+def _load_section(lines, sections, key, *, engine="rt"):
+    """Parse a single top-level section (None if it cannot be parsed on its own).
+
+    Anchors and aliases may be shared across sections (a section parsed
+    alone misses them, a section written back drops them), callers fall
+    back to the whole file then.
+    """
+
+    start, stop = sections[key]
+    text = "".join(lines[start:stop])
+
+    if has_yaml_references(text):
+        return None
+
+    section = load_yaml(text, engine=engine)
+
+    # i.e. non-string keys
+    if not isinstance(section, dict) or list(section) != [key]:
+        return None
+
+    return section
+
+
+def _splice_sections(text, updates):
+    """Replace touched sections in the text (None if the layout is not recognized)."""
+
+    lines = text.splitlines(True)
+
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n"
+
+    sections = _find_sections(lines)
+
+    if sections is None:
+        return None
+
+    replacements = {}
+
+    for update in updates:
+        for key in update:
+            if key in replacements:
+                continue
+
+            if not isinstance(key, str) or not SECTION_KEY.match(key + ":"):
+                return None
+
+            section = {}
+
+            if key in sections:
+                section = _load_section(lines, sections, key)
+
+                if section is None:
+                    return None
+
+            for extend_by in updates:
+                if key in extend_by:
+                    section = combine(section, {key: extend_by[key]})
+
+            replacements[key] = dump_yaml_into_str(section)
+
+    # Splice from the bottom, so line ranges of preceding sections stay valid
+    for key, (start, stop) in sorted(sections.items(), key=lambda item: -item[1][0]):
+        if key in replacements:
+            lines[start:stop] = [replacements.pop(key)]
+
+    # Sections not present yet are appended
+    lines.extend(replacements.values())
+
+    return "".join(lines)
+
+
+def _rewrite(text, updates):
+    """Merge updates into the whole state and serialize it again."""
+
+    state = load_yaml(text) if text.strip() else {}
+
+    for extend_by in updates:
+        state = combine(state or {}, extend_by)
+
+    return dump_yaml_into_str(state)
@@ -0,0 +1,226 @@
+"""Streaming runner of external commands (i.e. epicli).
+
+Output is streamed line by line to the console and a rotating log, runs
+have deadlines and are stopped together with their whole process group.
+Imported on first use, asyncio is too heavy for the cheap subcommands.
+"""
+
+import os
+import sys
+import signal
+import asyncio
+import subprocess
+import collections
+import logging.handlers
+
+
+# Longer output lines are split (bounds memory of the streaming runner)
+MAX_LINE_LENGTH = 64 * 1024
+
+# Seconds between SIGTERM and SIGKILL when a command is cancelled
+KILL_GRACE_SECONDS = 10.0
+
+# Last lines of stderr attached to errors of failed commands
+STDERR_TAIL_LINES = 20
+
+# Rotating output logs (size of a single file and number of old files)
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 3
+
+
+def run_streaming(command, *, log_file=None, timeout=None, silence_timeout=None,
+                  kill_grace=KILL_GRACE_SECONDS):
+    """Run a command, stream its output line by line to the console (and a rotating log).
+
+    The command (a string is run by the shell) gets its own process group,
+    when "timeout" (overall) or "silence_timeout" (since the last output
+    line) seconds pass the whole group is sent SIGTERM, then SIGKILL after
+    "kill_grace" seconds. Raises subprocess.TimeoutExpired in such a case
+    and subprocess.CalledProcessError for non-zero exit codes (with the last
+    lines of stderr as its "stderr"). Output is not kept in memory otherwise.
+    """
+
+    logger = _create_output_logger(log_file) if log_file is not None else None
+
+    try:
+        return asyncio.run(_run_streaming(command,
+                                          logger=logger,
+                                          timeout=timeout,
+                                          silence_timeout=silence_timeout,
+                                          kill_grace=kill_grace))
+    finally:
+        if logger is not None:
+            for handler in logger.handlers:
+                handler.close()
+
+
+def _create_output_logger(log_file):
+    """Create a (private) logger of command output writing into a rotating log."""
+
+    log_file.parent.mkdir(parents=True, exist_ok=True)
+
+    handler = logging.handlers.RotatingFileHandler(str(log_file),
+                                                   maxBytes=LOG_MAX_BYTES,
+                                                   backupCount=LOG_BACKUP_COUNT)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+
+    # Not registered globally, so nothing else logs into the file
+    logger = logging.Logger("azepi.output")
+    logger.addHandler(handler)
+
+    return logger
+
+
+async def _run_streaming(command, *, logger, timeout, silence_timeout, kill_grace):
+    """Run the command and watch its deadlines (see "run_streaming")."""
+
+    process = await _start_process(command)
+
+    loop = asyncio.get_event_loop()
+
+    started = loop.time()
+
+    # Time of the last output line (updated by both pumps)
+    last_output = [started]
+
+    stderr_tail = collections.deque(maxlen=STDERR_TAIL_LINES)
+
+    finished = asyncio.ensure_future(asyncio.gather(
+        _pump_lines(process.stdout, "stdout", logger, last_output),
+        _pump_lines(process.stderr, "stderr", logger, last_output, tail=stderr_tail),
+        process.wait(),
+    ))
+
+    def get_deadline():
+        deadlines = []
+        if timeout is not None:
+            deadlines.append((started + timeout, timeout))
+        if silence_timeout is not None:
+            deadlines.append((last_output[0] + silence_timeout, silence_timeout))
+        return min(deadlines, default=(None, None))
+
+    expired = None
+
+    try:
+        expired = await _wait_until_deadline(finished, get_deadline, loop)
+
+        if expired is None:
+            await finished
+    finally:
+        if not finished.done() or expired is not None:
+            finished.cancel()
+            await _terminate(process, kill_grace)
+            try:
+                await finished
+            except asyncio.CancelledError:
+                pass
+
+        # Pipes of cancelled pumps are still open, left to the garbage
+        # collector they would be closed after the loop (Python 3.7 reports
+        # "Event loop is closed"), the public API has no way to close them
+        process._transport.close()  # pylint: disable=protected-access
+
+    if expired is not None:
+        raise subprocess.TimeoutExpired(command, expired)
+
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, command,
+                                            stderr="".join(stderr_tail))
+
+    return process.returncode
+
+
+async def _start_process(command):
+    """Start the command (a string is run by the shell) in its own process group."""
+
+    if isinstance(command, str):
+        return await asyncio.create_subprocess_shell(command,
+                                                     stdout=subprocess.PIPE,
+                                                     stderr=subprocess.PIPE,
+                                                     start_new_session=True)
+
+    return await asyncio.create_subprocess_exec(*command,
+                                                stdout=subprocess.PIPE,
+                                                stderr=subprocess.PIPE,
+                                                start_new_session=True)
+
+
+async def _wait_until_deadline(finished, get_deadline, loop):
+    """Wait for the future, return the expired timeout (or None if it finished in time)."""
+
+    while not finished.done():
+        deadline, seconds = get_deadline()
+
+        if deadline is not None and deadline <= loop.time():
+            return seconds
+
+        await asyncio.wait({finished},
+                           timeout=None if deadline is None else deadline - loop.time())
+
+    return None
+
+
+async def _pump_lines(stream, name, logger, last_output, *, tail=None):
+    """Copy lines of a process' output to the console (and the log, and the tail)."""
+
+    loop = asyncio.get_event_loop()
+
+    console = sys.stdout if name == "stdout" else sys.stderr
+
+    pending = b""
+
+    while True:
+        chunk = await stream.read(MAX_LINE_LENGTH)
+        if not chunk:
+            break
+
+        last_output[0] = loop.time()
+
+        *lines, pending = (pending + chunk).split(b"\n")
+
+        if len(pending) >= MAX_LINE_LENGTH:
+            lines.append(pending)
+            pending = b""
+
+        for line in lines:
+            _emit_line(line, name, console, logger, tail)
+
+    if pending:
+        _emit_line(pending, name, console, logger, tail)
+
+
+def _emit_line(line, name, console, logger, tail):
+    """Print a single output line and log it (and keep it in the tail)."""
+
+    text = line.decode("utf-8", errors="replace").rstrip("\r")
+
+    console.write(text + "\n")
+    console.flush()
+
+    if logger is not None:
+        logger.info("%s %s", name, text)
+
+    if tail is not None:
+        tail.append(text + "\n")
+
+
+async def _terminate(process, kill_grace):
+    """Stop the whole process group (SIGTERM first, SIGKILL after the grace period)."""
+
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+    except ProcessLookupError:
+        return
+
+    try:
+        await asyncio.wait_for(process.wait(), kill_grace)
+    except asyncio.TimeoutError:
+        pass
+
+    # Remaining members of the group (i.e. ansible forks) are killed too
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+    await process.wait()
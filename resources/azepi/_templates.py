@@ -0,0 +1,86 @@
+"""Persistent cache of precompiled (parsed and cleaned) epicli default templates.
+
+Entries are pickles, so the cache dir must not be writable by anyone who is
+not trusted to run code in the container (it is baked into the image, see
+M_TEMPLATES_CACHE in the Dockerfile, never kept in the shared dir).
+"""
+
+import sys
+import pickle
+from ._helpers import load_yaml, digest_bytes, write_atomically
+
+
+# Bump when the format of cached entries (or the parsing) changes
+TEMPLATE_CACHE_VERSION = 2
+
+# Precompiled entries already read by this process (i.e. by a long-running
+# "serve" method), validated with identity of the template file
+_LOADED = {}
+
+
+def _get_parser_version():
+    """Identify the parser producing the entries (pickles of its scalar types)."""
+
+    import ruamel.yaml  # pylint: disable=import-outside-toplevel
+
+    return "{}:python-{}.{}:ruamel.yaml-{}".format(TEMPLATE_CACHE_VERSION,
+                                                   *sys.version_info[:2],
+                                                   ruamel.yaml.__version__)
+
+
+def load_template(path, *, cache_dir=None):
+    """Load a template using its precompiled form, (re)build it when missing or stale.
+
+    Each template has a single cache entry (per parser version), it is
+    validated with the digest of the template file and rebuilt (evicting
+    the old one) when the template changes. Without "cache_dir" templates
+    are kept in memory of the process only.
+    """
+
+    stat = path.stat()
+    identity = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    loaded = _LOADED.get(str(path))
+
+    # Unpickling gives a private copy, callers are free to modify it
+    if loaded is not None and loaded[0] == identity:
+        return pickle.loads(loaded[1])[1]
+
+    data = path.read_bytes()
+    digest = digest_bytes(data)
+
+    entry = None
+
+    if cache_dir is not None:
+        entry = cache_dir / (digest_bytes(f"{_get_parser_version()}:{path}") + ".pickle")
+
+        try:
+            pickled = entry.read_bytes()
+            cached_digest, document = pickle.loads(pickled)
+            if cached_digest == digest:
+                _LOADED[str(path)] = (identity, pickled)
+                return document
+        except (OSError, EOFError, ValueError, TypeError, AttributeError, ImportError,
+                pickle.UnpicklingError):
+            pass
+
+    document = load_yaml(data.decode("utf-8"))
+    pickled = pickle.dumps((digest, document), protocol=pickle.HIGHEST_PROTOCOL)
+
+    _LOADED[str(path)] = (identity, pickled)
+
+    if entry is not None:
+        try:
+            write_atomically(entry, pickled)
+        except OSError:
+            # Cache is an optimization only (i.e. read-only dir in the image)
+            pass
+
+    return document
+
+
+def precompile_templates(template_dir, cache_dir):
+    """Build cache entries of all component templates (i.e. when building the image)."""
+
+    for path in sorted((template_dir / "configuration").glob("*.yml")):
+        load_template(path, cache_dir=cache_dir)
@@ -1,10 +1,14 @@
 """Implementation of the "apply" method."""
 
 import os
-import subprocess
+import time
 import textwrap
-from ._helpers import combine, dump_yaml, get_path, load_yaml, q_kind, select
-from .plan import _diff_module_configs
+import subprocess
+from ._context import ModuleContext
+from ._profile import step
+from ._metrics import record_phase, record_documents, set_gauge
+from ._helpers import get_path, load_yaml, write_if_changed
+from .plan import _read_plan, _fingerprint_files, _fingerprint_sections
 
 
 FINAL_MODULE_STATE = '''
@@ -13,56 +17,158 @@ kind: state
   status: applied
 '''
 
+# Default deadlines of epicli runs in seconds (M_EPICLI_TIMEOUT and
+# M_EPICLI_SILENCE_TIMEOUT, zero disables them), hung Ansible runs are killed
+EPICLI_TIMEOUT = 4 * 60 * 60
+EPICLI_SILENCE_TIMEOUT = 60 * 60
+
+# Deadline of the SSH key permissions workaround in seconds
+SSH_KEY_PERMISSIONS_TIMEOUT = 60
+
+
+@step
+def _is_plan_current(v, plan):
+    """Make sure the plan was computed from the current state and config."""
+
+    # Cheap check first, files contain other modules' data too
+    if plan["files"] == _fingerprint_files(v):
+        return True
+
+    return plan["sections"] == _fingerprint_sections(v)
+
+
+@step
+def _validate_epiphany_config(v):
+    """Make sure enabled components refer to existing virtual machines."""
+
+    index = v.document_index
+
+    cluster = index.first("epiphany-cluster")
 
+    if cluster is None:
+        raise Exception("epiphany-cluster document not found")
+
+    problems = []
+
+    for key, value in cluster["specification"]["components"].items():
+        if int(value["count"]) <= 0:
+            continue
+
+        machines = value.get("machines", ())
+
+        if len(machines) < int(value["count"]):
+            problems.append(
+                f"{key} requires {value['count']} vms, {len(machines)} assigned")
+
+        problems.extend(
+            f"{key} refers to undefined vm {name}"
+            for name in machines
+            if index.get("infrastructure/machine", str(name)) is None
+        )
+
+    if problems:
+        raise Exception("invalid epiphany config: " + "; ".join(problems))
+
+
+@step
 def _extract_kubeconfig(v):
     """Extract kubeconfig from state and save it in a file."""
 
-    state = load_yaml(v["state_file"])
+    kubeconfig = v.upstream("azks")["output"]["kubeconfig.value"]
 
-    kubeconfig = state["azks"]["output"]["kubeconfig.value"]
+    write_if_changed(v["kubeconfig_file"], kubeconfig)
 
-    v["kubeconfig_file"].parent.mkdir(parents=True, exist_ok=True)
 
-    with v["kubeconfig_file"].open("w") as stream:
-        stream.write(kubeconfig)
+def _get_timeout(v, name, default):
+    """Read timeout in seconds from a variable (None if disabled)."""
 
+    seconds = float(v.get(name, default))
 
-def _run_epicli_apply(v):
-    """Deploy Epiphany."""
+    return seconds if seconds > 0 else None
 
-    try:
-        module_config = load_yaml(v["config_file"])[v["M_MODULE_SHORT"]]
 
-        epiphany_config = module_config["config"]
+def _run_epicli(v, epiphany_config, *, tags=None):
+    """Run "epicli apply" with the Epiphany config (limited to Ansible tags if given)."""
 
-        with v["epiphany_file"].open("w") as stream:
-            stream.write(epiphany_config)
+    try:
+        module_config = v.module_config
 
-        command = " ".join([
+        write_if_changed(v["epiphany_file"], epiphany_config)
+
+        # Build dir of epicli goes into this shared dir (the default is
+        # "/shared", shared by all environments applied in one container)
+        command = [
             "epicli",
             "--auto-approve",
+            "--output={}".format(v["shared_dir"]),
             "apply",
-            "--file='{}'".format(v["epiphany_file"]),
-            "--vault-password='{:s}'".format(module_config["vault_password"]),
-        ])
-
-        subprocess.run(command, shell=True, check=True)
+            "--file={}".format(v["epiphany_file"]),
+            "--vault-password={:s}".format(module_config["vault_password"]),
+        ]
+
+        if tags:
+            command.append("--ansible-tags={}".format(",".join(tags)))
+
+        # Imported on first use (asyncio is too heavy for the cheap subcommands)
+        from ._streaming import run_streaming  # pylint: disable=import-outside-toplevel
+
+        started = time.perf_counter()
+        exit_code = -1
+
+        try:
+            run_streaming(command,
+                          log_file=v["epicli_log_file"],
+                          timeout=_get_timeout(v, "M_EPICLI_TIMEOUT", EPICLI_TIMEOUT),
+                          silence_timeout=_get_timeout(v, "M_EPICLI_SILENCE_TIMEOUT",
+                                                       EPICLI_SILENCE_TIMEOUT))
+            exit_code = 0
+        except subprocess.CalledProcessError as error:
+            exit_code = error.returncode
+            raise
+        finally:
+            set_gauge(v, "azepi_epicli_duration_seconds", time.perf_counter() - started)
+            set_gauge(v, "azepi_epicli_exit_code", exit_code)
 
     finally:
         if v["epiphany_file"].exists():
             v["epiphany_file"].unlink()
 
 
-def _ensure_ssh_key_permissions(v):
-    """Apply SSH key permissions workaround for Docker on Windows."""
+def _is_option_rejected(error, option):
+    """Check if epicli failed because it does not know the option (argparse error)."""
+    return "unrecognized arguments" in (error.stderr or "") and option in error.stderr
+
+
+@step
+def _run_epicli_apply(v, scope):
+    """Deploy Epiphany (limited to the changed components if enabled and the plan allows it)."""
+
+    epiphany_config = v.module_config["config"]
+
+    # Ansible tags of epicli are not verified for all versions (opt-in)
+    if scope["full"] or v.get("M_SCOPED_APPLY", "").lower() not in {"1", "true", "yes"}:
+        _run_epicli(v, epiphany_config)
+        return
+
+    print("applying changes of {} only".format(", ".join(scope["documents"])))
 
-    module_config = load_yaml(v["config_file"])[v["M_MODULE_SHORT"]]
+    # The whole config is passed, epicli would recreate missing documents from
+    # defaults (and rewrite its manifest), real failures are not retried
+    try:
+        _run_epicli(v, epiphany_config, tags=scope["tags"])
+    except subprocess.CalledProcessError as error:
+        if not _is_option_rejected(error, "--ansible-tags"):
+            raise
+        print("epicli does not support --ansible-tags, falling back to a full apply")
+        _run_epicli(v, epiphany_config)
 
-    epiphany_config_docs = load_yaml(module_config["config"])
 
-    cluster = select(epiphany_config_docs,
-                     q_kind("epiphany-cluster"),
-                     exactly=1)
+@step
+def _ensure_ssh_key_permissions(v):
+    """Apply SSH key permissions workaround for Docker on Windows."""
+
+    # Same index as the validation and metrics use (documents are parsed once)
+    cluster = v.document_index.first("epiphany-cluster")
 
     spec_key_path = get_path(
         cluster["specification"]["admin_user"]["key_path"])
@@ -81,68 +187,54 @@ def _ensure_ssh_key_permissions(v):
         fi
     ''').strip()
 
-    result = subprocess.run(command, shell=True, check=True,
-                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    from ._streaming import run_streaming  # pylint: disable=import-outside-toplevel
 
-    if len(result.stdout) > 0:
-        print(result.stdout.decode("utf-8"))
+    run_streaming(command,
+                  log_file=v["epicli_log_file"],
+                  timeout=SSH_KEY_PERMISSIONS_TIMEOUT)
 
 
+@step
 def _update_state_file(v):
     """Make sure state is up to date."""
 
-    config = load_yaml(v["config_file"])[v["M_MODULE_SHORT"]]
-
-    state = load_yaml(v["state_file"])
+    v.update_state(load_yaml(FINAL_MODULE_STATE.format(**v).strip()))
 
-    state = combine(state, load_yaml(FINAL_MODULE_STATE.format(**v).strip()))
-
-    state = combine(state, {
-        v["M_MODULE_SHORT"]: config,
+    # Config is written back, so its formatting must survive (round-trip)
+    v.update_state({
+        v.module_short: load_yaml(v.config_content.decode("utf-8"))[v.module_short],
     })
 
-    with v["state_file"].open("w") as stream:
-        dump_yaml(state, stream=stream)
-
 
 def main(variables={}):
     """Handle apply method."""
 
-    # Compute paths
-    v = variables
-    v["shared_dir"] = get_path(v["M_SHARED"])
-
-    v["module_dir"] = get_path(
-        str(v["shared_dir"] / v["M_MODULE_SHORT"]))
+    # Compute paths (state and config are loaded lazily)
+    v = ModuleContext(variables)
 
-    v["config_file"] = get_path(
-        str(v["module_dir"] / v["M_CONFIG_NAME"]))
+    with record_phase(v, "apply"):
+        plan = _read_plan(v)
 
-    v["state_file"] = get_path(
-        str(v["shared_dir"] / v["M_STATE_FILE_NAME"]))
+        # Verified inputs are used for the rest of the method (read only once)
+        if not (plan is not None and bool(plan["diff"]) and _is_plan_current(v, plan)):
+            print("no changes to apply")
+            set_gauge(v, "azepi_apply_skipped", 1)
+            return
 
-    v["epiphany_file"] = get_path(
-        str(v["module_dir"] / "epiphany-config.yml"))
+        set_gauge(v, "azepi_apply_skipped", 0)
 
-    v["kubeconfig_file"] = get_path(
-        str(v["shared_dir"] / "build" / v["M_MODULE_SHORT"] / "kubeconfig"))
+        print(os.environ, "\n")
 
-    # Create plan file required for apply method
-    with (v["module_dir"] / "plan.diff").open("r") as stream:
-        plan_diff = stream.read()
+        _validate_epiphany_config(v)
 
-    current_diff = _diff_module_configs(v)
-
-    if not (bool(plan_diff) and bool(current_diff) and plan_diff == current_diff):
-        print("no changes to apply")
-        return
+        record_documents(v, v.document_index)
 
-    print(os.environ, "\n")
+        _extract_kubeconfig(v)
 
-    _extract_kubeconfig(v)
+        _ensure_ssh_key_permissions(v)
 
-    _ensure_ssh_key_permissions(v)
+        _run_epicli_apply(v, plan["scope"])
 
-    _run_epicli_apply(v)
+        _update_state_file(v)
 
-    _update_state_file(v)
+        v.flush()
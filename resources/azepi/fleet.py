@@ -0,0 +1,185 @@
+"""Implementation of the "fleet" method (plan/apply many shared dirs at once)."""
+
+import os
+import sys
+import glob
+import time
+import pathlib
+import importlib
+import traceback
+import contextlib
+import concurrent.futures
+from ._context import ModuleContext
+from .plan import _read_plan
+
+
+# Variables controlling the fleet itself (not passed to environments)
+FLEET_VARIABLES = {"M_FLEET_SHARED_DIRS", "M_FLEET_APPLY", "M_FLEET_JOBS", "M_FLEET_APPLY_JOBS"}
+
+# Variables naming a single environment (each environment gets its own)
+ENVIRONMENT_VARIABLES = {"M_SHARED", "M_ENVIRONMENT"}
+
+# Epicli runs are heavy, environments are applied one by one by default
+# (each run writes into the build dir of its own shared dir, see apply)
+DEFAULT_APPLY_JOBS = 1
+
+
+def _find_shared_dirs(patterns):
+    """Expand shared dir paths and glob patterns (sorted, without duplicates)."""
+
+    shared_dirs = {}
+
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.expanduser(pattern))) or [pattern]:
+            path = pathlib.Path(path).resolve()
+            if path.is_dir():
+                shared_dirs.setdefault(str(path), path)
+
+    return list(shared_dirs.values())
+
+
+def _run_phase(phase, variables):
+    """Run a lifecycle method for a single environment (in a worker process).
+
+    Output goes into the environment's log file, failures are reported in
+    the result (they do not affect other environments).
+    """
+
+    result = {
+        "log": None,
+        "error": None,
+        "changes": None,
+    }
+
+    started = time.perf_counter()
+
+    with contextlib.ExitStack() as stack:
+        try:
+            # Bad variables of a single environment are its own failure
+            v = ModuleContext(variables)
+
+            log_file = v["build_dir"] / f"fleet-{phase}.log"
+            log_file.parent.mkdir(parents=True, exist_ok=True)
+
+            result["log"] = str(log_file)
+
+            stream = stack.enter_context(log_file.open("w"))
+            stack.enter_context(contextlib.redirect_stdout(stream))
+            stack.enter_context(contextlib.redirect_stderr(stream))
+
+            importlib.import_module("." + phase, __package__).main(dict(variables))
+
+            if phase == "plan":
+                plan = _read_plan(v)
+                result["changes"] = bool(plan is not None and plan["diff"])
+
+        except Exception as error:  # pylint: disable=broad-except
+            traceback.print_exc()
+            result["error"] = f"{type(error).__name__}: {error}"
+
+    result["seconds"] = time.perf_counter() - started
+
+    return result
+
+
+def _run_all(phase, environments, max_workers):
+    """Run a lifecycle method for all environments in a process pool."""
+
+    if not environments:
+        return {}
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(max_workers, len(environments))) as executor:
+        futures = {
+            shared_dir: executor.submit(_run_phase, phase, variables)
+            for shared_dir, variables in environments.items()
+        }
+
+    return {
+        shared_dir: future.result()
+        for shared_dir, future in futures.items()
+    }
+
+
+def _summarize(shared_dirs, plans, applies):
+    """Print aggregated summary, return the number of failed environments."""
+
+    failures = 0
+
+    print(f"{'ENVIRONMENT':<40} {'PLAN':<12} {'APPLY':<12} {'SECONDS':>8}  LOG")
+
+    for shared_dir in shared_dirs:
+        plan = plans[shared_dir]
+        apply = applies.get(shared_dir)
+
+        if plan["error"] is not None:
+            plan_status = "failed"
+        else:
+            plan_status = "changes" if plan["changes"] else "no changes"
+
+        if apply is None:
+            apply_status = "-"
+        else:
+            apply_status = "failed" if apply["error"] is not None else "applied"
+
+        if "failed" in {plan_status, apply_status}:
+            failures += 1
+
+        seconds = plan["seconds"] + (apply["seconds"] if apply is not None else 0.0)
+        log = (apply or plan)["log"] or "-"
+
+        print(f"{str(shared_dir):<40} {plan_status:<12} {apply_status:<12} {seconds:8.1f}  {log}")
+
+        for result in [plan, apply]:
+            if result is not None and result["error"] is not None:
+                print(f"{'':<40} {result['error']}")
+
+    print(f"{len(shared_dirs)} environments, {failures} failed")
+
+    return failures
+
+
+def main(variables={}):
+    """Handle fleet method."""
+
+    patterns = [
+        pattern
+        for pattern in variables.get("M_FLEET_SHARED_DIRS", "").split(os.pathsep)
+        if pattern
+    ]
+
+    shared_dirs = _find_shared_dirs(patterns)
+
+    if not shared_dirs:
+        raise Exception("no shared dirs found")
+
+    jobs = int(variables.get("M_FLEET_JOBS", os.cpu_count() or 1))
+    apply_jobs = int(variables.get("M_FLEET_APPLY_JOBS", DEFAULT_APPLY_JOBS))
+
+    # Every environment gets its own variables (the shared dir differs)
+    environments = {
+        shared_dir: dict(
+            {
+                key: value
+                for key, value in variables.items()
+                if key not in FLEET_VARIABLES | ENVIRONMENT_VARIABLES
+            },
+            M_SHARED=str(shared_dir),
+        )
+        for shared_dir in shared_dirs
+    }
+
+    plans = _run_all("plan", environments, jobs)
+
+    applies = {}
+
+    if variables.get("M_FLEET_APPLY", "").lower() in {"1", "true", "yes"}:
+        applies = _run_all("apply", {
+            shared_dir: environment
+            for shared_dir, environment in environments.items()
+            if plans[shared_dir]["error"] is None and plans[shared_dir]["changes"]
+        }, apply_jobs)
+
+    sys.stdout.flush()
+
+    return 1 if _summarize(shared_dirs, plans, applies) else 0
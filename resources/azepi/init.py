@@ -1,8 +1,16 @@
 """Implementation of the "init" method."""
 
 import sys
-from ._helpers import (get_path, combine, dictify, undictify,
-                       load_yaml, dump_yaml, dump_yaml_into_str, to_literal_scalar)
+import itertools
+import concurrent.futures
+from ._context import ModuleContext
+from ._profile import step
+from ._metrics import record_phase, record_documents
+from ._templates import load_template
+from ._documents import EpiphanyCluster, FeatureMapping, ComponentConfig, Machine
+from ._helpers import (combine, dictify, undictify,
+                       load_yaml, dump_yaml, dump_yaml_into_str, to_literal_scalar,
+                       write_if_changed)
 
 
 # The standard "minimal-cluster-config.yml" is not used here because
@@ -68,6 +76,9 @@ specification:
   ip: TO_BE_SET
 '''
 
+# Upper bound for concurrent template loading
+TEMPLATE_LOADING_WORKERS = 8
+
 INITIAL_MODULE_STATE = '''
 kind: state
 {M_MODULE_SHORT}:
@@ -81,36 +92,79 @@ kind: {M_MODULE_SHORT}-config
 '''
 
 
+def _load_template(v, name):
+    """Load epicli default template (precompiled, from the persistent cache)."""
+
+    return load_template(v["template_dir"] / "configuration" / (name + ".yml"),
+                         cache_dir=v.get("templates_cache_dir"))
+
+
+def _load_templates(v, names):
+    """Load many templates concurrently (results are in the order of names)."""
+
+    if not names:
+        return []
+
+    max_workers = min(TEMPLATE_LOADING_WORKERS, len(names))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(_load_template, v, name)
+            for name in names
+        ]
+
+    templates = []
+    errors = []
+
+    # Report all failures at once, not just the first one
+    for name, future in zip(names, futures):
+        try:
+            templates.append(future.result())
+        except Exception as error:  # pylint: disable=broad-except
+            errors.append(f"{name}: {error}")
+
+    if errors:
+        raise Exception("unable to load templates: " + "; ".join(errors))
+
+    return templates
+
+
 def _get_enabled_components(cluster):
     """Get all components with non-zero "count"."""
 
     return [
-        (key, value)
-        for key, value in cluster["specification"]["components"].items()
-        if int(value["count"]) > 0
+        (key, component)
+        for key, component in cluster.specification.components.items()
+        if int(component.count) > 0
     ]
 
 
-def _get_dummy_machines(cluster):
+def _create_machine(prototype, name, **specification):
+    """Create virtual machine document from the prototype record (shallow copies only)."""
+
+    return prototype.copy(name=name, provider="any",
+                          specification=prototype.specification.copy(**specification))
+
+
+def _get_dummy_machines(prototype, enabled_components):
     """Generate dummy virtual machine documents."""
 
     count = sum(
-        value["count"]
-        for _, value in _get_enabled_components(cluster)
+        int(component.count)
+        for _, component in enabled_components
     )
 
     return [
-        combine(load_yaml(VIRTUAL_MACHINE_TEMPLATE), {
-            "name": "default-vm-" + str(index + 1),
-        })
+        _create_machine(prototype, "default-vm-" + str(index + 1))
         for index in range(count)
     ]
 
 
+@step
 def _process_cluster(v):
     """Process the main cluster document."""
 
-    return combine(load_yaml(MINIMAL_EPIPHANY_CLUSTER), {
+    return EpiphanyCluster.from_dict(combine(load_yaml(MINIMAL_EPIPHANY_CLUSTER), {
         "name": v["M_MODULE_SHORT"],
         "provider": "any",
         "specification": {
@@ -119,23 +173,28 @@ def _process_cluster(v):
                 "key_path": str(v["shared_dir"] / v["VMS_RSA_FILENAME"]),
             },
         },
-    })
+    }))
 
 
+@step
 def _process_feature_mapping(v):
     """Process feature mapping (enable applications)."""
 
-    return combine(load_yaml(MINIMAL_FEATURE_MAPPING), {
+    return FeatureMapping.from_dict(combine(load_yaml(MINIMAL_FEATURE_MAPPING), {
         "name": v["M_MODULE_SHORT"],
         "provider": "any",
-    })
+    }))
 
 
-def _process_machines(v, cluster):
+@step
+def _process_machines(v, cluster, enabled_components):
     """Process virtual machines."""
 
+    # Parsed once, machine documents are (compact) shallow copies of it
+    prototype = Machine.from_dict(load_yaml(VIRTUAL_MACHINE_TEMPLATE, engine="safe"))
+
     def read_vms_from_state_file():
-        state = load_yaml(v["state_file"])["azbi"]
+        state = v.upstream("azbi")
         output = state["output"]
 
         vm_names = output["vm_names.value"]
@@ -149,42 +208,37 @@ def _process_machines(v, cluster):
 
     def derive_machines(vms):
         return [
-            combine(load_yaml(VIRTUAL_MACHINE_TEMPLATE), {
-                "name": "default-" + vm_name,
-                "provider": "any",
-                "specification": {
-                    "hostname": vm_name,
-                    "ip": vm_ip,
-                },
-            })
+            _create_machine(prototype, "default-" + vm_name,
+                            hostname=vm_name,
+                            ip=vm_ip)
             for vm_name, vm_ip in vms
         ]
 
     def assign_machines_to_components(machines, cluster):
-        number_of_required_vms = sum(
-            int(value["count"])
-            for _, value in _get_enabled_components(cluster)
-        )
-
-        if number_of_required_vms > len(machines):
-            raise Exception("not enough vms available")
-
-        # Convert virtual machine list to iterator
-        machines = iter(machines)
-
-        return combine(cluster, {
-            "specification": {
-                "components": {
-                    key: {
-                        "machines": [
-                            next(machines)["name"]
-                            for _ in range(int(value["count"]))
-                        ],
-                    }
-                    for key, value in _get_enabled_components(cluster)
-                },
-            },
-        })
+        # Single pass over machines, shortfalls of all components are reported at once
+        machine_names = (machine.name for machine in machines)
+
+        assignments = {}
+        shortfalls = []
+
+        for key, component in enabled_components:
+            count = int(component.count)
+
+            assignments[key] = component.copy(
+                machines=list(itertools.islice(machine_names, count)))
+
+            available = len(assignments[key].machines)
+            if available < count:
+                shortfalls.append(f"{key} requires {count} (only {available} available)")
+
+        if shortfalls:
+            raise Exception("not enough vms available: " + "; ".join(shortfalls))
+
+        # Shallow copies of records along the changed path only
+        specification = cluster.specification
+
+        return cluster.copy(specification=specification.copy(
+            components={**specification.components, **assignments}))
 
     try:
         # Read data from the state file
@@ -193,29 +247,33 @@ def _process_machines(v, cluster):
     except (FileNotFoundError, KeyError):
         # Fallback to dummy values if there is no state to read
         vms = []
-        machines = _get_dummy_machines(cluster)
+        machines = _get_dummy_machines(prototype, enabled_components)
 
     cluster = assign_machines_to_components(machines, cluster)
 
     return machines, cluster
 
 
-def _process_components(v, cluster):
+@step
+def _process_components(v, enabled_components):
     """Process component defaults."""
 
+    names = [
+        key
+        for key, _ in enabled_components
+    ]
+
     return [
-        combine(load_yaml(v["template_dir"] / "configuration" / (key + ".yml")), {
-            "provider": "any",
-        })
-        for key, _ in _get_enabled_components(cluster)
+        ComponentConfig(template, provider="any")
+        for template in _load_templates(v, names)
     ]
 
 
+@step
 def _process_applications(v):
     """Process application defaults."""
 
-    template = load_yaml(
-        v["template_dir"] / "configuration" / "applications.yml")
+    template = _load_template(v, "applications")
 
     # Add provider key
     document = combine(template, {
@@ -235,36 +293,25 @@ def _process_applications(v):
         if "use_local_image_registry" in value
     })
 
-    return combine(document, {
+    return ComponentConfig.from_dict(combine(document, {
         "specification": {
             # Convert-back to list-based dictionary
             "applications": undictify(applications),
         },
-    })
+    }))
 
 
+@step
 def _update_state_file(v):
     """Add module's state to the state file."""
 
-    try:
-        state = load_yaml(v["state_file"])
-    except FileNotFoundError:
-        state = {}
-
-    state = combine(state, load_yaml(INITIAL_MODULE_STATE.format(**v).strip()))
-
-    with v["state_file"].open("w") as stream:
-        dump_yaml(state, stream=stream)
+    v.update_state(load_yaml(INITIAL_MODULE_STATE.format(**v).strip()))
 
 
+@step
 def _output_data(v, documents):
     """Save and display generated config."""
 
-    v["module_dir"].mkdir(parents=True, exist_ok=True)
-
-    if v["config_file"].exists():
-        v["config_file"].rename(v["backup_file"])
-
     config = load_yaml(INITIAL_MODULE_CONFIG.format(**v).strip())
 
     output = dump_yaml_into_str(documents)
@@ -275,8 +322,11 @@ def _output_data(v, documents):
         },
     })
 
-    with v["config_file"].open("w") as stream:
-        dump_yaml(config, stream=stream)
+    # The backup holds the previous config (rewritten only when it differs)
+    if v["config_file"].exists():
+        write_if_changed(v["backup_file"], v["config_file"].read_bytes())
+
+    write_if_changed(v["config_file"], dump_yaml_into_str(config))
 
     dump_yaml(config, stream=sys.stdout)
 
@@ -284,35 +334,29 @@ def _output_data(v, documents):
 def main(variables={}):
     """Handle init method."""
 
-    # Compute paths
-    v = variables
-    v["shared_dir"] = get_path(v["M_SHARED"])
-    v["template_dir"] = get_path(v["M_TEMPLATES"])
+    # Compute paths (state and config are loaded lazily)
+    v = ModuleContext(variables)
+
+    with record_phase(v, "init"):
+        cluster = _process_cluster(v)
 
-    v["module_dir"] = get_path(
-        str(v["shared_dir"] / v["M_MODULE_SHORT"]))
+        mapping = _process_feature_mapping(v)
 
-    v["config_file"] = get_path(
-        str(v["module_dir"] / v["M_CONFIG_NAME"]))
+        # Computed once, shared by machine assignment and component defaults
+        enabled_components = _get_enabled_components(cluster)
 
-    v["state_file"] = get_path(
-        str(v["shared_dir"] / v["M_STATE_FILE_NAME"]))
+        machines, cluster = _process_machines(v, cluster, enabled_components)
 
-    v["backup_file"] = get_path(
-        str(v["module_dir"] / (v["M_CONFIG_NAME"] + ".backup")))
+        components = _process_components(v, enabled_components)
 
-    cluster = _process_cluster(v)
+        applications = _process_applications(v)
 
-    mapping = _process_feature_mapping(v)
+        documents = [cluster] + [mapping] + machines + components + [applications]
 
-    machines, cluster = _process_machines(v, cluster)
+        _output_data(v, documents)
 
-    components = _process_components(v, cluster)
+        record_documents(v, documents)
 
-    applications = _process_applications(v)
+        _update_state_file(v)
 
-    _output_data(v, [cluster] + [mapping]
-                              + machines
-                              + components
-                              + [applications])
-    _update_state_file(v)
+        v.flush()
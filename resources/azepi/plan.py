@@ -1,48 +1,200 @@
 """Implementation of the "plan" method."""
 
 import sys
-from ._helpers import get_path, load_yaml, dump_yaml_into_str, sorted_dict, udiff
+import json
+from ._context import ModuleContext
+from ._profile import step
+from ._metrics import record_phase
+from ._helpers import (load_yaml, dump_yaml_into_str, sorted_dict, tree_diff, format_path,
+                       udiff, digest_bytes, digest_data, write_if_changed)
 
 
-def _diff_module_configs(v):
-    """Compute unified diff between state and module config."""
+PLAN_VERSION = 2
 
-    state = load_yaml(v["state_file"])[v["M_MODULE_SHORT"]]
+# Documents describing the cluster topology (changes require a full apply),
+# besides all non-"configuration/*" ones (i.e. "infrastructure/machine")
+TOPOLOGY_KINDS = {"configuration/feature-mapping", "configuration/shared-config"}
 
-    # Remove known keys that are not parts of the config
-    for key_to_remove in {"status", "output"}:
-        if key_to_remove in state:
-            del state[key_to_remove]
 
-    config = load_yaml(v["config_file"])[v["M_MODULE_SHORT"]]
+def _without_status(state):
+    """Skip known keys of the module state that are not parts of the config."""
+
+    return {
+        key: value
+        for key, value in state.items()
+        if key not in {"status", "output"}
+    }
+
+
+def _get_module_sections(v):
+    """Return state and config sections of the module (in comparable form)."""
+    return _without_status(v.module_state), v.module_config
+
+
+def _expand_config(section):
+    """Replace the embedded Epiphany config with its documents keyed by "kind/name"."""
+
+    if not isinstance(section.get("config"), str):
+        return section
+
+    documents = load_yaml(section["config"], engine="safe")
+
+    # A single document is not wrapped in a list by load_yaml
+    if not isinstance(documents, list):
+        documents = [documents]
+
+    return dict(section, config={
+        f"{document.get('kind')}/{document.get('name')}": document
+        for document in documents
+        if isinstance(document, dict)
+    })
+
+
+@step
+def _compute_changes(v):
+    """Compute structural differences between state and module config."""
+
+    state, config = _get_module_sections(v)
+
+    return list(tree_diff(_expand_config(state),
+                          _expand_config(config),
+                          path=(v.module_short,)))
+
+
+def _is_topology_kind(kind):
+    """Check if changes of the document kind require a full apply."""
+    return not kind.startswith("configuration/") or kind in TOPOLOGY_KINDS
+
+
+@step
+def _compute_scope(changes):
+    """Work out which Epiphany documents (and Ansible roles) the changes are limited to.
+
+    The scope is "full" if anything else than non-topology "configuration/*"
+    documents changed (i.e. machines, vault password, the whole config).
+    Roles are named after document kinds ("configuration/kubernetes-master"
+    is handled by the "kubernetes_master" role).
+    """
+
+    documents = set()
+
+    for _, path, _, _ in changes:
+        # Path is (module, "config", "kind/name", ...) for changes inside documents
+        if len(path) < 3 or path[1] != "config":
+            return {"full": True, "documents": [], "tags": []}
+
+        kind = path[2].rsplit("/", 1)[0]
+
+        if _is_topology_kind(kind):
+            return {"full": True, "documents": [], "tags": []}
+
+        documents.add(path[2])
+
+    return {
+        "full": False,
+        "documents": sorted(documents),
+        "tags": sorted({
+            document.rsplit("/", 1)[0].split("/", 1)[1].replace("-", "_")
+            for document in documents
+        }),
+    }
+
+
+@step
+def _render_diff(v):
+    """Render unified diff between state and module config."""
+
+    # Read again with the round-trip engine, so quoting and literal blocks
+    # are shown the way they are written in the files
+    state = load_yaml(v.state_content.decode("utf-8"))[v.module_short]
+    config = load_yaml(v.config_content.decode("utf-8"))[v.module_short]
 
     return udiff(
-        dump_yaml_into_str(sorted_dict(state)),
+        dump_yaml_into_str(sorted_dict(_without_status(state))),
         dump_yaml_into_str(sorted_dict(config)),
     ).strip()
 
 
-def main(variables={}):
-    """Handle plan method."""
+@step
+def _fingerprint_files(v):
+    """Compute content digests of the state and module config files."""
+
+    return {
+        "state": digest_bytes(v.state_content),
+        "config": digest_bytes(v.config_content),
+    }
+
+
+@step
+def _fingerprint_sections(v):
+    """Compute content digests of the (comparable) state and config sections."""
+
+    state, config = _get_module_sections(v)
+
+    return {
+        "state": digest_data(state),
+        "config": digest_data(config),
+    }
+
 
-    # Compute paths
-    v = variables
-    v["shared_dir"] = get_path(v["M_SHARED"])
+@step
+def _read_plan(v):
+    """Read the plan artifact (None if missing or incompatible)."""
 
-    v["module_dir"] = get_path(
-        str(v["shared_dir"] / v["M_MODULE_SHORT"]))
+    try:
+        with v["plan_file"].open("r") as stream:
+            plan = json.load(stream)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if plan.get("version") != PLAN_VERSION:
+        return None
+
+    return plan
+
+
+@step
+def _write_plan(v, config_diff, changes):
+    """Write plan artifacts (the diff and structured plan with input fingerprints)."""
+
+    plan = {
+        "version": PLAN_VERSION,
+        "files": _fingerprint_files(v),
+        "sections": _fingerprint_sections(v),
+        "changes": [
+            {
+                "operation": operation,
+                "path": format_path(path),
+            }
+            for operation, path, _, _ in changes
+        ],
+        "scope": _compute_scope(changes),
+        "diff": config_diff,
+    }
+
+    write_if_changed(v["plan_diff_file"], config_diff)
+
+    write_if_changed(v["plan_file"], json.dumps(plan, indent=2))
+
+
+def main(variables={}):
+    """Handle plan method."""
 
-    v["config_file"] = get_path(
-        str(v["module_dir"] / v["M_CONFIG_NAME"]))
+    # Compute paths (state and config are loaded lazily)
+    v = ModuleContext(variables)
 
-    v["state_file"] = get_path(
-        str(v["shared_dir"] / v["M_STATE_FILE_NAME"]))
+    with record_phase(v, "plan"):
+        plan = _read_plan(v)
 
-    config_diff = _diff_module_configs(v)
+        # Nothing to compute if inputs did not change since the last plan
+        if plan is not None and plan["files"] == _fingerprint_files(v):
+            config_diff = plan["diff"]
+        else:
+            changes = _compute_changes(v)
+            config_diff = _render_diff(v) if changes else ""
 
-    # Create plan file required for apply method
-    with (v["module_dir"] / "plan.diff").open("w") as stream:
-        stream.write(config_diff)
+            # Create plan files required for apply method
+            _write_plan(v, config_diff, changes)
 
-    if config_diff:
-        print(config_diff, file=sys.stdout)
+        if config_diff:
+            print(config_diff, file=sys.stdout)
@@ -0,0 +1,143 @@
+"""Implementation of the "serve" method (warm daemon for frequently called methods).
+
+The daemon keeps lifecycle modules and yaml parsers imported, parsed yaml
+documents and precompiled templates cached (caches are keyed by identity
+or content of files, so changed files are parsed again). Requests are
+JSON lines over a Unix socket, they are handled one at a time.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import signal
+import socket
+import importlib
+import traceback
+import contextlib
+import socketserver
+from ._helpers import get_path, load_yaml
+from ._client import SERVED_METHODS
+
+
+def _execute(request):
+    """Run a lifecycle method, capture its output and failure."""
+
+    method = request.get("method")
+
+    response = {
+        "stdout": "",
+        "stderr": "",
+        "result": None,
+        "error": None,
+    }
+
+    if method not in SERVED_METHODS:
+        response["error"] = f"unsupported method: {method}\n"
+        return response
+
+    stdout, stderr = io.StringIO(), io.StringIO()
+    cwd = os.getcwd()
+    started = time.perf_counter()
+
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            # Relative paths in variables are relative to the client
+            os.chdir(request.get("cwd", cwd))
+            result = importlib.import_module("." + method, __package__).main(
+                dict(request["variables"]))
+
+        if isinstance(result, int):
+            response["result"] = result
+
+    except Exception:  # pylint: disable=broad-except
+        response["error"] = traceback.format_exc()
+
+    finally:
+        os.chdir(cwd)
+
+    response["stdout"] = stdout.getvalue()
+    response["stderr"] = stderr.getvalue()
+
+    print(f"{method} {request.get('variables', {}).get('M_SHARED', '-')}"
+          f" {time.perf_counter() - started:.3f}s"
+          f"{' failed' if response['error'] is not None else ''}", file=sys.stderr)
+
+    return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    """Handle a single request (a JSON line, answered with a JSON line)."""
+
+    def handle(self):
+        line = self.rfile.readline()
+
+        try:
+            request = json.loads(line)
+        except ValueError as error:
+            request = {"method": None}
+            print(f"invalid request: {error}", file=sys.stderr)
+
+        self.wfile.write(json.dumps(_execute(request)).encode("utf-8") + b"\n")
+
+
+def _remove_stale_socket(socket_path):
+    """Remove socket left behind by a dead daemon, refuse to replace a live one."""
+
+    if not os.path.exists(socket_path):
+        return
+
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+
+    try:
+        connection.connect(socket_path)
+    except ConnectionRefusedError:
+        os.unlink(socket_path)
+        return
+    finally:
+        connection.close()
+
+    raise Exception(f"server is already listening on {socket_path}")
+
+
+def _warm_up():
+    """Import lifecycle modules and yaml parsers before the first request."""
+
+    for method in SERVED_METHODS:
+        importlib.import_module("." + method, __package__)
+
+    for engine in ["rt", "safe"]:
+        load_yaml("warm: up", engine=engine)
+
+
+def main(variables={}):
+    """Handle serve method."""
+
+    if "M_SERVER_SOCKET" not in variables:
+        raise Exception("M_SERVER_SOCKET is not set")
+
+    socket_path = str(get_path(variables["M_SERVER_SOCKET"]))
+
+    _remove_stale_socket(socket_path)
+
+    _warm_up()
+
+    # Stop serving (and remove the socket) when the container is stopped
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+
+    server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+
+    try:
+        os.chmod(socket_path, 0o600)
+
+        print(f"serving {', '.join(SERVED_METHODS)} on {socket_path}", file=sys.stderr)
+
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.server_close()
+        os.unlink(socket_path)
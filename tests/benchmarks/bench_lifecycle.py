@@ -0,0 +1,276 @@
+"""Benchmark of the init/plan/apply lifecycle phases (in-process, without Docker).
+
+Usage:
+    python tests/benchmarks/bench_lifecycle.py \\
+        --vms 2 100 1000 5000 --output bench_output.json [--compare previous.json]
+
+Each size runs in a separate process against a generated shared dir with
+synthetic "azbi"/"azks" state, synthetic epicli default templates and a
+local "epicli" stub, wall time, peak RSS and per-step times are recorded.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import pathlib
+import argparse
+import importlib
+import platform
+import resource
+import tempfile
+import functools
+import contextlib
+import subprocess
+import concurrent.futures
+
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent.parent
+
+# Make the "azepi" package importable (also in worker processes)
+if str(ROOT_DIR / "resources") not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR / "resources"))
+
+DEFAULT_VM_COUNTS = [2, 10, 100, 1000, 5000]
+
+# Internal steps reported in the per-phase breakdown
+STEPS = {
+    "init": ["_process_cluster", "_process_feature_mapping", "_process_machines",
+             "_process_components", "_process_applications", "_output_data",
+             "_update_state_file"],
+    "plan": ["_compute_changes", "_render_diff", "_write_plan"],
+    "apply": ["_validate_epiphany_config", "_extract_kubeconfig",
+              "_ensure_ssh_key_permissions", "_run_epicli_apply", "_update_state_file"],
+}
+
+COMPONENT_TEMPLATE = '''
+kind: configuration/{name}
+title: "{name} config"
+name: default
+specification:
+  settings:
+    enabled: true
+    values: [1, 2, 3]
+'''
+
+APPLICATIONS_TEMPLATE = '''
+kind: configuration/applications
+title: "Kubernetes Applications Config"
+name: default
+specification:
+  applications:
+{applications}
+'''
+
+APPLICATION = '''
+  - name: application-{index}
+    enabled: false
+    use_local_image_registry: true
+'''
+
+EPICLI_STUB = '''#!/bin/sh
+echo "epicli stub: $@"
+'''
+
+
+def _generate_state(vm_count):
+    """Generate synthetic state with "azbi" and "azks" outputs."""
+
+    return {
+        "kind": "state",
+        "azbi": {
+            "status": "applied",
+            "use_public_ip": False,
+            "output": {
+                "private_ips.value": [
+                    f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}"
+                    for index in range(vm_count)
+                ],
+                "public_ips.value": [],
+                "vm_names.value": [
+                    f"azbi-{index}"
+                    for index in range(vm_count)
+                ],
+            },
+        },
+        "azks": {
+            "status": "applied",
+            "output": {
+                "kubeconfig.value": "apiVersion: v1\nkind: Config\n",
+            },
+        },
+    }
+
+
+def _generate_environment(work_dir, vm_count):
+    """Generate shared dir, templates and epicli stub, return module variables."""
+
+    dump_yaml = importlib.import_module("azepi._helpers").dump_yaml
+
+    shared_dir = work_dir / "shared"
+    template_dir = work_dir / "templates"
+    bin_dir = work_dir / "bin"
+
+    for path in [shared_dir, template_dir / "configuration", bin_dir]:
+        path.mkdir(parents=True)
+
+    with (shared_dir / "state.yml").open("w") as stream:
+        dump_yaml(_generate_state(vm_count), stream=stream)
+
+    (shared_dir / "vms_rsa").write_text("")
+    (shared_dir / "vms_rsa").chmod(0o600)
+
+    for name in ["repository", "kubernetes_master", "kubernetes_node", "logging",
+                 "monitoring", "kafka", "postgresql", "load_balancer", "rabbitmq"]:
+        (template_dir / "configuration" / (name + ".yml")).write_text(
+            COMPONENT_TEMPLATE.format(name=name))
+
+    (template_dir / "configuration" / "applications.yml").write_text(
+        APPLICATIONS_TEMPLATE.format(applications="".join(
+            APPLICATION.format(index=index)
+            for index in range(20)
+        )))
+
+    (bin_dir / "epicli").write_text(EPICLI_STUB)
+    (bin_dir / "epicli").chmod(0o755)
+
+    os.environ["PATH"] = str(bin_dir) + os.pathsep + os.environ["PATH"]
+
+    return {
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+        "M_TEMPLATES": str(template_dir),
+        "M_SHARED": str(shared_dir),
+        "VMS_RSA_FILENAME": "vms_rsa",
+    }
+
+
+def _instrument(module, names, timings):
+    """Wrap internal steps of a lifecycle module with timers."""
+
+    def wrap(name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+        return wrapper
+
+    for name in names:
+        if hasattr(module, name):
+            setattr(module, name, wrap(name, getattr(module, name)))
+
+
+def _max_rss_kb():
+    """Peak resident set size of this process (in kilobytes)."""
+
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports kilobytes, macOS bytes
+    return usage // 1024 if sys.platform == "darwin" else usage
+
+
+def _run_scenario(vm_count):
+    """Run init, plan and apply for a generated shared dir (in a fresh process)."""
+
+    with tempfile.TemporaryDirectory() as work_dir_name:
+        variables = _generate_environment(pathlib.Path(work_dir_name), vm_count)
+
+        results = {
+            "vms": vm_count,
+            "phases": {},
+        }
+
+        for phase in ["init", "plan", "apply"]:
+            module = importlib.import_module("azepi." + phase)
+
+            timings = {}
+            _instrument(module, STEPS[phase], timings)
+
+            started = time.perf_counter()
+
+            # Lifecycle methods are chatty (whole configs are printed)
+            with contextlib.redirect_stdout(io.StringIO()):
+                module.main(dict(variables))
+
+            results["phases"][phase] = {
+                "seconds": time.perf_counter() - started,
+                "max_rss_kb": _max_rss_kb(),
+                "steps": timings,
+            }
+
+        return results
+
+
+def _get_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                              cwd=str(ROOT_DIR), check=True,
+                              stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL).stdout.decode("utf-8").strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_results(results, previous=None):
+    """Print human-readable summary (optionally compared with previous results)."""
+
+    previous_phases = {
+        (item["vms"], phase): value["seconds"]
+        for item in (previous or {}).get("results", [])
+        for phase, value in item["phases"].items()
+    }
+
+    for item in results["results"]:
+        for phase, value in item["phases"].items():
+            line = (f"{item['vms']:>6} vms  {phase:<6} {value['seconds']:9.3f}s"
+                    f"  {value['max_rss_kb'] / 1024:8.1f}MiB")
+
+            baseline = previous_phases.get((item["vms"], phase))
+            if baseline:
+                line += f"  x{value['seconds'] / baseline:.2f}"
+
+            print(line)
+
+            for step, seconds in sorted(value["steps"].items(), key=lambda step: -step[1]):
+                print(f"{'':>20}{step:<30} {seconds:9.3f}s")
+
+
+def main():
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vms", type=int, nargs="+", default=DEFAULT_VM_COUNTS)
+    parser.add_argument("--output", type=pathlib.Path)
+    parser.add_argument("--compare", type=pathlib.Path)
+    arguments = parser.parse_args()
+
+    results = {
+        "revision": _get_revision(),
+        "python": platform.python_version(),
+        "results": [],
+    }
+
+    for vm_count in arguments.vms:
+        # Fresh process per size, so peak RSS (and caches) are not shared
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            results["results"].append(executor.submit(_run_scenario, vm_count).result())
+
+    previous = None
+    if arguments.compare is not None:
+        with arguments.compare.open("r") as stream:
+            previous = json.load(stream)
+
+    _print_results(results, previous)
+
+    if arguments.output is not None:
+        with arguments.output.open("w") as stream:
+            json.dump(results, stream, indent=2)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
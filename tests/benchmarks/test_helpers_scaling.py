@@ -0,0 +1,198 @@
+"""Scaling benchmark of the "_helpers" functions (time and allocations vs. size).
+
+Usage:
+    PYTHONPATH=resources python -m pytest -s tests/benchmarks/test_helpers_scaling.py
+
+Documents of growing depth (~1k, ~10k and ~100k nodes) are generated, each
+helper is timed (best of several runs) and its peak allocation measured with
+tracemalloc. Curves are printed, growth between consecutive sizes (10x more
+nodes) must stay within budgets, so super-linear helpers are caught.
+"""
+
+import copy
+import time
+import tracemalloc
+import pytest
+from azepi._helpers import (combine, dictify, undictify, select, q_kind,
+                            load_yaml, dump_yaml_into_str, invalidate_yaml_cache,
+                            tree_diff, udiff)
+
+
+WIDTH = 10
+
+DEPTHS = [3, 4, 5]
+
+REPEATS = 3
+
+# Slow helpers are not repeated (once the budget is spent)
+REPEAT_SECONDS = 1.0
+
+# Linear growth is 10x, leave room for O(n log n) and noise
+TIME_GROWTH_BUDGET = 30.0
+
+ALLOCATION_GROWTH_BUDGET = 30.0
+
+# Timings below the resolution are dominated by noise
+MINIMAL_SECONDS = 0.001
+
+
+def _generate_tree(depth, width, prefix=""):
+    """Generate a full nested document (width^depth scalar leaves)."""
+
+    if depth <= 0:
+        return [f"value {prefix}", 1, True, None, "multi\nline\n"][len(prefix) % 5]
+
+    return {
+        f"key-{index}": _generate_tree(depth - 1, width, f"{prefix}{index}")
+        for index in range(width)
+    }
+
+
+def _generate_documents(depth, width):
+    """Generate Epiphany-like documents (about width^depth nodes in total)."""
+
+    return [
+        {
+            "kind": f"configuration/kind-{index % width}",
+            "name": f"document-{index}",
+            "specification": _generate_tree(1, width, str(index)),
+        }
+        for index in range(width ** (depth - 1))
+    ]
+
+
+def _change_leaf(tree):
+    """Return a copy of the tree with a single leaf changed (deep in the middle)."""
+
+    key = sorted(tree)[len(tree) // 2]
+    value = tree[key]
+
+    return combine(tree, {
+        key: _change_leaf(value) if isinstance(value, dict) else "changed",
+    })
+
+
+def _count_nodes(something):
+    if isinstance(something, dict):
+        return 1 + sum(_count_nodes(value) for value in something.values())
+    if isinstance(something, list):
+        return 1 + sum(_count_nodes(value) for value in something)
+    return 1
+
+
+def _prepare(depth):
+    """Generate all inputs for a given depth (outside of measurements)."""
+
+    tree = _generate_tree(depth, WIDTH)
+    changed_tree = _change_leaf(tree)
+    documents = _generate_documents(depth, WIDTH)
+    tree_str = dump_yaml_into_str(tree)
+
+    return {
+        "nodes": _count_nodes(tree),
+        "tree": tree,
+        "changed_tree": changed_tree,
+        "copied_tree": copy.deepcopy(tree),
+        "overlay": _change_leaf({key: tree[key] for key in list(tree)[:1]}),
+        "documents": documents,
+        "dictified": dictify(documents),
+        "tree_str": tree_str,
+        "changed_tree_str": dump_yaml_into_str(changed_tree),
+    }
+
+
+def _load_yaml(engine):
+    def load(inputs):
+        # Measure parsing, not the cache
+        invalidate_yaml_cache()
+        return load_yaml(inputs["tree_str"], engine=engine)
+    return load
+
+
+HELPERS = {
+    "combine (small overlay)": lambda inputs: combine(inputs["tree"], inputs["overlay"]),
+    "combine (full)": lambda inputs: combine(inputs["tree"], inputs["changed_tree"]),
+    "dictify": lambda inputs: dictify(inputs["documents"]),
+    "undictify": lambda inputs: undictify(inputs["dictified"]),
+    "select": lambda inputs: select(inputs["documents"], q_kind("configuration/kind-0")),
+    "load_yaml (rt)": _load_yaml("rt"),
+    "load_yaml (safe)": _load_yaml("safe"),
+    "dump_yaml": lambda inputs: dump_yaml_into_str(inputs["tree"]),
+    "tree_diff (equal copies)": lambda inputs: list(tree_diff(inputs["tree"],
+                                                              inputs["copied_tree"])),
+    "tree_diff (localized change)": lambda inputs: list(tree_diff(inputs["tree"],
+                                                                  inputs["changed_tree"])),
+    "udiff (localized change)": lambda inputs: udiff(inputs["tree_str"],
+                                                     inputs["changed_tree_str"]),
+}
+
+
+# Helpers known to exceed the budgets (changes of their behaviour are
+# reviewed on their own, i.e. with output parity tests)
+KNOWN_OVER_BUDGET = {
+    "udiff (localized change)": "difflib matches whole dumps (quadratic in the worst case)",
+}
+
+
+def _measure(helper, inputs):
+    """Return best time (in seconds) and peak allocation (in bytes) of a helper."""
+
+    seconds = []
+    while len(seconds) < REPEATS and sum(seconds) < REPEAT_SECONDS:
+        started = time.perf_counter()
+        helper(inputs)
+        seconds.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    try:
+        helper(inputs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(seconds), peak
+
+
+def _get_helper_params():
+    """Names of all helpers (known ones over budget are expected to fail)."""
+
+    params = []
+    for name in HELPERS:
+        if name in KNOWN_OVER_BUDGET:
+            params.append(pytest.param(name, marks=pytest.mark.xfail(
+                reason=KNOWN_OVER_BUDGET[name], strict=True)))
+        else:
+            params.append(name)
+
+    return params
+
+
+@pytest.fixture(scope="module", name="inputs_by_depth")
+def fixture_inputs_by_depth():
+    """Inputs of all sizes (generated once for all helpers)."""
+    return {
+        depth: _prepare(depth)
+        for depth in DEPTHS
+    }
+
+
+@pytest.mark.parametrize("name", _get_helper_params())
+def test_helper_scaling(name, inputs_by_depth):
+    """Benchmark of a helper (growth between sizes must stay within budgets)."""
+
+    curve = [
+        (inputs_by_depth[depth]["nodes"],) + _measure(HELPERS[name], inputs_by_depth[depth])
+        for depth in DEPTHS
+    ]
+
+    print()
+    for nodes, seconds, peak in curve:
+        print(f"{name:<30} {nodes:>8} nodes {seconds:10.4f}s {peak / 1024:12.1f}KiB")
+
+    for (_, seconds_a, peak_a), (_, seconds_b, peak_b) in zip(curve, curve[1:]):
+        time_growth = max(seconds_b, MINIMAL_SECONDS) / max(seconds_a, MINIMAL_SECONDS)
+        assert time_growth <= TIME_GROWTH_BUDGET, f"{name} time grows x{time_growth:.1f}"
+
+        allocation_growth = max(peak_b, 1) / max(peak_a, 1)
+        assert allocation_growth <= ALLOCATION_GROWTH_BUDGET, \
+            f"{name} allocations grow x{allocation_growth:.1f}"
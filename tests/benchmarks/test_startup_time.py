@@ -0,0 +1,111 @@
+"""Cold start (wall and import time) budgets of the cheap entrypoint subcommands.
+
+Usage:
+    PYTHONPATH=resources python -m pytest -s tests/benchmarks/test_startup_time.py
+
+Kept out of the unit tests (Docker build), timings are not reliable on
+loaded machines. Imported modules are checked by tests/unit/test_startup.py.
+"""
+
+import os
+import sys
+import time
+import pathlib
+import subprocess
+from azepi._helpers import dump_yaml
+
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent.parent
+
+ENTRYPOINT = ROOT_DIR / "workdir" / "entrypoint.py"
+
+# Generous budgets (whole process), the point is to catch heavy
+# dependencies being imported eagerly again
+STARTUP_BUDGET_SECONDS = 2.0
+IMPORT_BUDGET_SECONDS = 0.5
+
+STATE = {
+    "kind": "state",
+    "azepi": {
+        "status": "applied",
+        "config": "kind: epiphany-cluster\n",
+    },
+}
+
+CONFIG = {
+    "kind": "azepi-config",
+    "azepi": {
+        "config": "kind: epiphany-cluster\n",
+    },
+}
+
+
+def _run_with_importtime(command, shared_dir):
+    """Run entrypoint subcommand with "-X importtime", return wall time and the report."""
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT_DIR / "resources"),
+        M_VERSION="0.0.0",
+        M_MODULE_SHORT="azepi",
+        M_CONFIG_NAME="azepi-config.yml",
+        M_STATE_FILE_NAME="state.yml",
+        M_SHARED=str(shared_dir),
+    )
+
+    started = time.monotonic()
+
+    result = subprocess.run([sys.executable, "-X", "importtime", str(ENTRYPOINT), command],
+                            env=env, check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    elapsed = time.monotonic() - started
+
+    # Format: "import time: self [us] | cumulative | imported package",
+    # nested imports are indented (only top-level ones are summed up)
+    report = {}
+    total = 0
+    for line in result.stderr.decode("utf-8").splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        report[name.strip()] = int(cumulative)
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+
+    return elapsed, total / 1e6, report
+
+
+def _check_budget(command, shared_dir):
+    elapsed, total, report = _run_with_importtime(command, shared_dir)
+
+    print(f"{command}: {elapsed:.3f}s wall, {total:.3f}s imports")
+    for name, cumulative in sorted(report.items(), key=lambda item: -item[1])[:10]:
+        print(f"  {cumulative / 1e3:8.1f}ms {name}")
+
+    assert elapsed < STARTUP_BUDGET_SECONDS
+
+    assert total < IMPORT_BUDGET_SECONDS
+
+
+def test_startup_time_metadata(tmp_path):
+    """Cold start of the "metadata" subcommand."""
+
+    _check_budget("metadata", tmp_path)
+
+
+def test_startup_time_plan_without_changes(tmp_path):
+    """Cold start of the "plan" subcommand when inputs did not change."""
+
+    (tmp_path / "azepi").mkdir()
+
+    with (tmp_path / "state.yml").open("w") as stream:
+        dump_yaml(STATE, stream=stream)
+
+    with (tmp_path / "azepi" / "azepi-config.yml").open("w") as stream:
+        dump_yaml(CONFIG, stream=stream)
+
+    # The first run computes the plan
+    _run_with_importtime("plan", tmp_path)
+
+    _check_budget("plan", tmp_path)
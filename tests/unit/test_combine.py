@@ -1,5 +1,6 @@
 """Unit testing of the "combine" function."""
 
+import copy
 from azepi._helpers import combine
 
 
@@ -43,3 +44,30 @@ def test_combine():
     """Unit test for the "combine" function."""
 
     assert combine(INPUT, UPDATE) == OUTPUT
+
+
+def test_combine_does_not_mutate_inputs():
+    """Unit test for the "combine" function (inputs are left intact)."""
+
+    to_merge = copy.deepcopy(INPUT)
+    extend_by = copy.deepcopy(UPDATE)
+
+    combine(to_merge, extend_by)
+
+    assert to_merge == INPUT
+
+    assert extend_by == UPDATE
+
+
+def test_combine_shares_untouched_subtrees():
+    """Unit test for the "combine" function (only touched paths are copied)."""
+
+    output = combine(INPUT, {"must-be-true": True})
+
+    assert output["must-be-nested"] is INPUT["must-be-nested"]
+
+    output = combine(INPUT, {"must-be-nested": {"must-be-true": True}})
+
+    assert output["must-be-nested"] is not INPUT["must-be-nested"]
+
+    assert output["must-be-empty"] is INPUT["must-be-empty"]
@@ -0,0 +1,78 @@
+"""Unit testing of the "_compute_scope" function."""
+
+from azepi._helpers import tree_diff
+from azepi.plan import _compute_scope
+
+
+STATE = {
+    "vault_password": "asd",
+    "config": {
+        "epiphany-cluster/azepi": {
+            "kind": "epiphany-cluster",
+            "specification": {"components": {"postgresql": {"count": 1}}},
+        },
+        "configuration/applications/default": {
+            "kind": "configuration/applications",
+            "specification": {"applications": [{"name": "rabbitmq", "enabled": False}]},
+        },
+        "configuration/kubernetes-master/default": {
+            "kind": "configuration/kubernetes-master",
+            "specification": {"version": "1.18.6"},
+        },
+    },
+}
+
+
+def _changes(**config):
+    updated = dict(STATE, config=dict(STATE["config"], **config))
+    return list(tree_diff(STATE, updated, path=("azepi",)))
+
+
+def test_compute_scope():
+    """Unit test for the "_compute_scope" function (changes limited to components)."""
+
+    changes = _changes(**{
+        "configuration/applications/default": {
+            "kind": "configuration/applications",
+            "specification": {"applications": [{"name": "rabbitmq", "enabled": True}]},
+        },
+        "configuration/kubernetes-master/default": {
+            "kind": "configuration/kubernetes-master",
+            "specification": {"version": "1.18.7"},
+        },
+    })
+
+    assert _compute_scope(changes) == {
+        "full": False,
+        "documents": [
+            "configuration/applications/default",
+            "configuration/kubernetes-master/default",
+        ],
+        "tags": ["applications", "kubernetes_master"],
+    }
+
+
+def test_compute_scope_full():
+    """Unit test for the "_compute_scope" function (topology or other changes)."""
+
+    cluster_changes = _changes(**{
+        "epiphany-cluster/azepi": {
+            "kind": "epiphany-cluster",
+            "specification": {"components": {"postgresql": {"count": 2}}},
+        },
+    })
+
+    assert _compute_scope(cluster_changes)["full"]
+
+    mapping_changes = _changes(**{
+        "configuration/feature-mapping/azepi": {
+            "kind": "configuration/feature-mapping",
+        },
+    })
+
+    assert _compute_scope(mapping_changes)["full"]
+
+    password_changes = list(tree_diff(STATE, dict(STATE, vault_password="qwe"),
+                                      path=("azepi",)))
+
+    assert _compute_scope(password_changes)["full"]
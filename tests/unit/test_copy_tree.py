@@ -0,0 +1,50 @@
+"""Unit testing of the "copy_tree" function."""
+
+import datetime
+from azepi._helpers import copy_tree, load_yaml
+
+
+INPUT = '''
+kind: state
+azepi:
+  config: |
+    kind: epiphany-cluster
+  quoted: "yes"
+  output:
+    vm_names.value: [azbi-0, azbi-1]
+'''
+
+
+def test_copy_tree():
+    """Unit test for the "copy_tree" function (containers are copied, scalars shared)."""
+
+    document = load_yaml(INPUT)
+
+    copied = copy_tree(document)
+
+    assert copied == document
+
+    assert copied["azepi"] is not document["azepi"]
+    assert copied["azepi"]["output"]["vm_names.value"] is not \
+        document["azepi"]["output"]["vm_names.value"]
+
+    # Immutable scalars keep their (round-trip) types
+    assert copied["azepi"]["config"] is document["azepi"]["config"]
+    assert copied["azepi"]["quoted"] is document["azepi"]["quoted"]
+
+    copied["azepi"]["output"]["vm_names.value"].append("azbi-2")
+
+    assert document["azepi"]["output"]["vm_names.value"] == ["azbi-0", "azbi-1"]
+
+
+def test_copy_tree_with_other_objects():
+    """Unit test for the "copy_tree" function (other objects are deep-copied)."""
+
+    document = {"set": {1, 2}, "created": datetime.datetime(2021, 1, 1)}
+
+    copied = copy_tree(document)
+
+    assert copied == document
+
+    assert copied["set"] is not document["set"]
+    assert copied["created"] is document["created"]
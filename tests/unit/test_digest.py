@@ -0,0 +1,30 @@
+"""Unit testing of the "digest_bytes" and "digest_data" functions."""
+
+from azepi._helpers import digest_bytes, digest_data
+
+
+DICT1 = {
+    "a": 1,
+    "b": [1, 2],
+}
+
+DICT2 = {
+    "b": [1, 2],
+    "a": 1,
+}
+
+
+def test_digest_bytes():
+    """Unit test for the "digest_bytes" function."""
+
+    assert digest_bytes("abc") == digest_bytes(b"abc")
+
+    assert digest_bytes("abc") != digest_bytes("abd")
+
+
+def test_digest_data():
+    """Unit test for the "digest_data" function (key order does not matter)."""
+
+    assert digest_data(DICT1) == digest_data(DICT2)
+
+    assert digest_data(DICT1) != digest_data({"a": 1, "b": [2, 1]})
@@ -0,0 +1,77 @@
+"""Unit testing of the "DocumentIndex" class."""
+
+import pytest
+from azepi._documents import DocumentIndex, thaw
+
+
+INPUT = [
+    {
+        "kind": "epiphany-cluster",
+        "name": "azepi",
+        "specification": {
+            "components": {
+                "postgresql": {
+                    "count": 1,
+                    "machines": ["default-azbi-0"],
+                },
+            },
+        },
+    },
+    {
+        "kind": "infrastructure/machine",
+        "name": "default-azbi-0",
+        "specification": {
+            "hostname": "azbi-0",
+            "ip": "10.0.1.4",
+        },
+    },
+    {
+        "kind": "infrastructure/machine",
+        "name": "default-azbi-1",
+        "specification": {
+            "hostname": "azbi-1",
+            "ip": "10.0.1.5",
+        },
+    },
+]
+
+
+def test_document_index_queries():
+    """Unit test for the "DocumentIndex" class (queries)."""
+
+    index = DocumentIndex(INPUT)
+
+    assert len(index) == 3
+
+    assert thaw(index.first("epiphany-cluster")) == INPUT[0]
+
+    assert thaw(index.by_kind("infrastructure/machine")) == INPUT[1:]
+
+    assert thaw(index.by_name("default-azbi-1")) == INPUT[2:]
+
+    assert thaw(index.get("infrastructure/machine", "default-azbi-0")) == INPUT[1]
+
+    assert index.get("epiphany-cluster", "default-azbi-0") is None
+
+    assert thaw(index.machine_by_hostname("azbi-1")) == INPUT[2]
+
+    assert thaw(index.machine_by_ip("10.0.1.4")) == INPUT[1]
+
+    assert index.machine_by_ip("10.0.1.6") is None
+
+
+def test_document_index_views_are_read_only():
+    """Unit test for the "DocumentIndex" class (views cannot be modified)."""
+
+    index = DocumentIndex(INPUT)
+
+    cluster = index.first("epiphany-cluster")
+
+    with pytest.raises(TypeError):
+        cluster["name"] = "changed"
+
+    with pytest.raises(TypeError):
+        cluster["specification"]["components"]["postgresql"]["count"] = 2
+
+    with pytest.raises(AttributeError):
+        cluster["specification"]["components"]["postgresql"]["machines"].append("vm")
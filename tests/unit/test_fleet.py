@@ -0,0 +1,105 @@
+"""Unit testing of the "fleet" method."""
+
+import os
+import json
+from azepi import fleet
+from azepi.fleet import _find_shared_dirs
+
+
+STATE = '''
+kind: state
+azepi:
+  status: initialized
+'''
+
+CONFIG = '''
+kind: azepi-config
+azepi:
+  config: |
+    kind: epiphany-cluster
+    name: azepi
+  vault_password: "asd"
+'''
+
+
+def _create_shared_dir(shared_dir, config=True):
+    (shared_dir / "azepi").mkdir(parents=True)
+
+    with (shared_dir / "state.yml").open("w") as stream:
+        stream.write(STATE)
+
+    if config:
+        with (shared_dir / "azepi" / "azepi-config.yml").open("w") as stream:
+            stream.write(CONFIG)
+
+    return shared_dir
+
+
+def test_find_shared_dirs(tmp_path):
+    """Unit test for the "_find_shared_dirs" function."""
+
+    for name in ["b", "a", "c"]:
+        (tmp_path / name).mkdir()
+
+    (tmp_path / "file").touch()
+
+    assert _find_shared_dirs([
+        str(tmp_path / "*"),
+        str(tmp_path / "a"),
+        str(tmp_path / "missing"),
+    ]) == [tmp_path / "a", tmp_path / "b", tmp_path / "c"]
+
+
+def test_fleet_plan(tmp_path, capsys):
+    """Unit test for the "fleet" method (failures are isolated and summarized)."""
+
+    good = _create_shared_dir(tmp_path / "good")
+    bad = _create_shared_dir(tmp_path / "bad", config=False)
+
+    result = fleet.main({
+        "M_FLEET_SHARED_DIRS": os.pathsep.join([str(tmp_path / "*")]),
+        "M_FLEET_JOBS": "2",
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+    })
+
+    assert result == 1
+
+    with (good / "azepi" / "plan.json").open("r") as stream:
+        assert json.load(stream)["diff"]
+
+    assert not (bad / "azepi" / "plan.json").exists()
+    assert (bad / "build" / "azepi" / "fleet-plan.log").read_text()
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines[1].split()[:3] == [str(bad), "failed", "-"]
+    assert [line.split()[:3] for line in lines if line.startswith(str(good))] == [
+        [str(good), "changes", "-"],
+    ]
+    assert lines[-1] == "2 environments, 1 failed"
+
+
+def test_fleet_plan_with_broken_shared_dir(tmp_path, capsys):
+    """Unit test for the "fleet" method (failures of the context are isolated too)."""
+
+    _create_shared_dir(tmp_path / "good")
+    broken = _create_shared_dir(tmp_path / "broken")
+
+    # The build dir (for the log file) cannot be created
+    (broken / "build").touch()
+
+    result = fleet.main({
+        "M_FLEET_SHARED_DIRS": str(tmp_path / "*"),
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+    })
+
+    assert result == 1
+
+    lines = capsys.readouterr().out.splitlines()
+
+    assert lines[1].split() == [str(broken), "failed", "-", lines[1].split()[3], "-"]
+    assert lines[3].split()[:3] == [str(tmp_path / "good"), "changes", "-"]
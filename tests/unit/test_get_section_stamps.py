@@ -0,0 +1,45 @@
+"""Unit testing of the "get_section_stamps" function."""
+
+from azepi._state import get_section_stamps
+
+
+INPUT = '''kind: state
+azbi:
+  status: applied
+azepi:
+  status: initialized
+  tags:
+    env: dev
+'''
+
+INPUT_WITH_ALIASES = '''kind: state
+azbi:
+  status: applied
+  tags: &tags
+    env: dev
+azepi:
+  status: initialized
+  tags: *tags
+'''
+
+
+def test_get_section_stamps():
+    """Unit test for the "get_section_stamps" function (formatting does not matter)."""
+
+    stamps = get_section_stamps(INPUT, ["azepi", "azks"])
+
+    assert stamps["azks"] is None
+
+    assert stamps == get_section_stamps("---\n" + INPUT.replace("  ", "    "), ["azepi", "azks"])
+
+    assert stamps != get_section_stamps(INPUT.replace("initialized", "applied"), ["azepi", "azks"])
+
+
+def test_get_section_stamps_with_aliases_across_sections():
+    """Unit test for the "get_section_stamps" function (fallback to the whole file)."""
+
+    assert get_section_stamps(INPUT_WITH_ALIASES, ["azepi"]) == \
+        get_section_stamps(INPUT, ["azepi"])
+
+    assert get_section_stamps(INPUT_WITH_ALIASES, ["azbi"]) != \
+        get_section_stamps(INPUT, ["azbi"])
@@ -0,0 +1,34 @@
+"""Unit testing of the "has_yaml_references" function."""
+
+from azepi._helpers import has_yaml_references
+
+
+INPUT_WITHOUT_REFERENCES = '''azepi:
+  status: initialized
+  vault_password: "p&ss*word"
+  pattern: '*'
+  command: a && b
+'''
+
+INPUT_WITH_ANCHOR = '''azbi:
+  tags: &tags
+    env: dev
+'''
+
+INPUT_WITH_ALIAS = '''azepi:
+  tags: *tags
+'''
+
+
+def test_has_yaml_references():
+    """Unit test for the "has_yaml_references" function."""
+
+    assert not has_yaml_references("azepi:\n  status: initialized\n")
+
+    # Quoted and plain scalars may contain "&" and "*"
+    assert not has_yaml_references(INPUT_WITHOUT_REFERENCES)
+
+    assert has_yaml_references(INPUT_WITH_ANCHOR)
+
+    # Sections may refer to anchors defined in other sections
+    assert has_yaml_references(INPUT_WITH_ALIAS)
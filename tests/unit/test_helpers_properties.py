@@ -0,0 +1,210 @@
+"""Property-based testing of the "_helpers" functions (random nested documents)."""
+
+import re
+import copy
+import random
+from azepi._helpers import (combine, dictify, undictify, select, q_kind,
+                            load_yaml, dump_yaml_into_str, invalidate_yaml_cache,
+                            tree_diff, udiff)
+
+
+SEEDS = range(50)
+
+MAX_DEPTH = 4
+
+MAX_WIDTH = 5
+
+SCALARS = [None, True, False, 0, 1, -7, 3.5, "", "yes", "no", "null", "1.0",
+           "value", "with: colon", "# hash", "multi\nline\n", "trailing space "]
+
+
+def _random_scalar(rng):
+    return rng.choice(SCALARS)
+
+
+def _random_tree(rng, depth, width):
+    """Generate a random nested document (dictionaries, lists and scalars)."""
+
+    if depth <= 0:
+        return _random_scalar(rng)
+
+    choice = rng.random()
+
+    if choice < 0.2:
+        return _random_scalar(rng)
+
+    if choice < 0.4:
+        return [
+            _random_tree(rng, depth - 1, width)
+            for _ in range(rng.randint(0, width))
+        ]
+
+    return {
+        f"key-{index}": _random_tree(rng, depth - 1, width)
+        for index in rng.sample(range(width * 2), rng.randint(0, width))
+    }
+
+
+def _random_dict(rng):
+    return {
+        f"key-{index}": _random_tree(rng, MAX_DEPTH - 1, MAX_WIDTH)
+        for index in rng.sample(range(MAX_WIDTH * 2), rng.randint(0, MAX_WIDTH))
+    }
+
+
+def _random_documents(rng):
+    return [
+        {
+            "kind": rng.choice(["configuration/a", "configuration/b", "infrastructure/c"]),
+            "name": f"document-{index}",
+            "specification": _random_dict(rng),
+        }
+        for index in range(rng.randint(0, MAX_WIDTH * 2))
+    ]
+
+
+def _apply_udiff(str_a, diff):
+    """Apply an unified diff (as produced by "udiff") to a string."""
+
+    lines_a = str_a.splitlines(True)
+    lines_out = []
+    position = 0
+
+    for line in diff.splitlines(True):
+        match = re.match(r"@@ -(\d+)(?:,(\d+))? \+\d+(?:,\d+)? @@", line)
+        if match is not None:
+            start = int(match.group(1))
+            length = 1 if match.group(2) is None else int(match.group(2))
+            # Empty ranges point at the line before
+            start = start - 1 if length else start
+            lines_out.extend(lines_a[position:start])
+            position = start
+        elif line.startswith("+"):
+            lines_out.append(line[1:])
+        else:
+            assert lines_a[position] == line[1:]
+            if line.startswith(" "):
+                lines_out.append(line[1:])
+            position += 1
+
+    lines_out.extend(lines_a[position:])
+
+    return "".join(lines_out)
+
+
+def test_combine_properties():
+    """Property test for the "combine" function (no mutation, identity, idempotence)."""
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        dict_a, dict_b = _random_dict(rng), _random_dict(rng)
+        copy_a, copy_b = copy.deepcopy(dict_a), copy.deepcopy(dict_b)
+
+        merged = combine(dict_a, dict_b)
+
+        assert dict_a == copy_a
+        assert dict_b == copy_b
+
+        assert set(merged) == set(dict_a) | set(dict_b)
+        for key, value in dict_b.items():
+            if not isinstance(value, dict) or not isinstance(dict_a.get(key), dict):
+                assert merged[key] == value
+
+        assert combine(dict_a, {}) == dict_a
+        assert combine({}, dict_a) == dict_a
+        assert combine(dict_a, dict_a) == dict_a
+        assert combine(merged, dict_b) == merged
+
+
+def test_dictify_undictify_properties():
+    """Property test for the "dictify" and "undictify" functions (round trips)."""
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        documents = _random_documents(rng)
+        copy_documents = copy.deepcopy(documents)
+
+        assert undictify(dictify(documents)) == documents
+        assert documents == copy_documents
+
+        a_dict = _random_dict(rng)
+        a_dict = {key: value for key, value in a_dict.items() if isinstance(value, dict)}
+        copy_dict = copy.deepcopy(a_dict)
+
+        assert dictify(undictify(a_dict)) == {
+            key: combine(value, {"name": key})
+            for key, value in a_dict.items()
+        }
+        assert a_dict == copy_dict
+
+
+def test_select_properties():
+    """Property test for the "select" function (equivalent to filtering)."""
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        documents = _random_documents(rng)
+        kind = rng.choice(["configuration/a", "configuration/b", "infrastructure/c"])
+        expected = [document for document in documents if document["kind"] == kind]
+
+        assert select(documents, q_kind(kind)) == expected
+        assert select(iter(documents), q_kind(kind)) == expected
+
+        if expected:
+            assert select(documents, q_kind(kind), exactly=1) == expected[0]
+        else:
+            assert select(documents, q_kind(kind), exactly=1) is None
+
+
+def test_yaml_round_trip_properties():
+    """Property test for the "load_yaml" and "dump_yaml" functions (round trips)."""
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        a_dict = _random_dict(rng)
+        a_str = dump_yaml_into_str(a_dict)
+
+        for engine in ["rt", "safe"]:
+            invalidate_yaml_cache()
+            loaded = load_yaml(a_str, engine=engine)
+            assert (loaded or {}) == a_dict
+            assert dump_yaml_into_str(loaded or {}) == a_str
+
+
+def test_tree_diff_properties():
+    """Property test for the "tree_diff" function (no changes iff equal)."""
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        dict_a, dict_b = _random_dict(rng), _random_dict(rng)
+
+        assert not list(tree_diff(dict_a, copy.deepcopy(dict_a)))
+        assert bool(list(tree_diff(dict_a, dict_b))) == (dict_a != dict_b)
+
+
+def test_udiff_properties():
+    """Property test for the "udiff" function (empty for equal inputs, applies cleanly)."""
+
+    for seed in SEEDS:
+        rng = random.Random(seed)
+        str_a = dump_yaml_into_str(_random_dict(rng))
+        lines_b = str_a.splitlines(True)
+
+        # Localized edits of the same document
+        for _ in range(rng.randint(1, 4)):
+            position = rng.randint(0, len(lines_b))
+            operation = rng.choice(["insert", "delete", "replace"])
+            if operation == "insert" or not lines_b[position:]:
+                lines_b.insert(position, "inserted: true\n")
+            elif operation == "delete":
+                del lines_b[position]
+            else:
+                lines_b[position] = "replaced: true\n"
+
+        str_b = "".join(lines_b)
+
+        assert udiff(str_a, str_a) == ""
+
+        for number_of_context_lines in [0, 1, 3]:
+            diff = udiff(str_a, str_b, number_of_context_lines=number_of_context_lines)
+            assert _apply_udiff(str_a, diff) == str_b
@@ -0,0 +1,65 @@
+"""Unit testing of the "load_template" function."""
+
+from azepi._templates import load_template, precompile_templates
+
+
+INPUT1 = '''
+kind: configuration/postgresql
+title: "Postgresql"
+specification:
+  count: 1
+'''
+
+INPUT2 = INPUT1.replace("count: 1", "count: 2")
+
+
+def test_load_template(tmp_path):
+    """Unit test for the "load_template" function (cache is built and evicted)."""
+
+    template = tmp_path / "postgresql.yml"
+    cache_dir = tmp_path / "cache"
+
+    template.write_text(INPUT1)
+
+    document = load_template(template, cache_dir=cache_dir)
+
+    assert document["specification"]["count"] == 1
+
+    entries = list(cache_dir.iterdir())
+
+    assert len(entries) == 1
+
+    # Precompiled entry is used when the template did not change
+    assert load_template(template, cache_dir=cache_dir) == document
+
+    template.write_text(INPUT2)
+
+    assert load_template(template, cache_dir=cache_dir)["specification"]["count"] == 2
+
+    # Stale entry is replaced
+    assert list(cache_dir.iterdir()) == entries
+
+
+def test_load_template_without_cache_dir(tmp_path):
+    """Unit test for the "load_template" function (nothing is written without a cache dir)."""
+
+    template = tmp_path / "postgresql.yml"
+
+    template.write_text(INPUT1)
+
+    assert load_template(template)["specification"]["count"] == 1
+
+    assert list(tmp_path.iterdir()) == [template]
+
+
+def test_precompile_templates(tmp_path):
+    """Unit test for the "precompile_templates" function."""
+
+    (tmp_path / "configuration").mkdir()
+
+    for name in ["kafka", "postgresql"]:
+        (tmp_path / "configuration" / (name + ".yml")).write_text(INPUT1)
+
+    precompile_templates(tmp_path, tmp_path / "cache")
+
+    assert len(list((tmp_path / "cache").iterdir())) == 2
@@ -0,0 +1,45 @@
+"""Unit testing of the "_load_templates" function (init)."""
+
+import pytest
+from azepi.init import _load_templates
+
+
+def _create_variables(tmp_path, names):
+    (tmp_path / "configuration").mkdir()
+
+    for name in names:
+        (tmp_path / "configuration" / (name + ".yml")).write_text(f"kind: configuration/{name}\n")
+
+    return {
+        "template_dir": tmp_path,
+        "templates_cache_dir": tmp_path / "cache",
+    }
+
+
+def test_load_templates_order(tmp_path):
+    """Unit test for the "_load_templates" function (results are in order)."""
+
+    names = ["kafka", "postgresql", "rabbitmq", "logging", "monitoring"]
+
+    v = _create_variables(tmp_path, names)
+
+    assert [
+        template["kind"]
+        for template in _load_templates(v, names)
+    ] == [
+        "configuration/" + name
+        for name in names
+    ]
+
+
+def test_load_templates_errors(tmp_path):
+    """Unit test for the "_load_templates" function (all errors are reported)."""
+
+    v = _create_variables(tmp_path, ["kafka"])
+
+    with pytest.raises(Exception) as error:
+        _load_templates(v, ["missing1", "kafka", "missing2"])
+
+    assert "missing1:" in str(error.value)
+
+    assert "missing2:" in str(error.value)
@@ -1,6 +1,6 @@
 """Unit testing of the "load_yaml" function."""
 
-from azepi._helpers import load_yaml, dump_yaml_into_str
+from azepi._helpers import load_yaml, iter_yaml_documents, dump_yaml, dump_yaml_into_str
 
 
 INPUT1 = '''
@@ -62,6 +62,44 @@ OUTPUT3 = [
     },
 ]
 
+INPUT3 = '''
+base: &base
+  name: "quoted"
+  list: [1, 2]
+alias: *base
+merged:
+  <<: *base
+  extra: 1
+  name: own
+'''
+
+OUTPUT4 = '''
+base:
+  name: "quoted"
+  list:
+    - 1
+    - 2
+alias:
+  name: "quoted"
+  list:
+    - 1
+    - 2
+merged:
+  name: own
+  list:
+    - 1
+    - 2
+  extra: 1
+'''
+
+
+def _collect_container_types(something):
+    if isinstance(something, dict):
+        return {type(something)}.union(*map(_collect_container_types, something.values()))
+    if isinstance(something, list):
+        return {type(something)}.union(*map(_collect_container_types, something))
+    return set()
+
 
 def test_load_yaml_with_single_document():
     """Unit test for the "load_yaml" function (single document)."""
@@ -77,3 +115,52 @@ def test_load_yaml_with_multiple_documents():
     """Unit test for the "load_yaml" function (multiple documents)."""
 
     assert load_yaml(INPUT2) == OUTPUT3
+
+
+def test_load_yaml_returns_private_copies():
+    """Unit test for the "load_yaml" function (cached results are copied on read)."""
+
+    loaded = load_yaml(INPUT1)
+    loaded["key0"][0]["must-be-true"] = False
+
+    assert load_yaml(INPUT1) == OUTPUT1
+
+
+def test_load_yaml_cache_invalidation(tmp_path):
+    """Unit test for the "load_yaml" function (writes invalidate cached files)."""
+
+    path = tmp_path / "document.yml"
+
+    with path.open("w") as stream:
+        dump_yaml(OUTPUT3[0], stream=stream)
+
+    assert load_yaml(path) == OUTPUT3[0]
+
+    with path.open("w") as stream:
+        dump_yaml(OUTPUT3[1], stream=stream)
+
+    assert load_yaml(path) == OUTPUT3[1]
+
+
+def test_iter_yaml_documents():
+    """Unit test for the "iter_yaml_documents" function (lazy parsing)."""
+
+    documents = iter_yaml_documents(INPUT2 + "---\n[invalid")
+
+    assert next(documents) == OUTPUT3[0]
+
+    assert next(documents) == OUTPUT3[1]
+
+
+def test_load_yaml_builds_plain_structures():
+    """Unit test for the "load_yaml" function (plain containers, aliases are copies)."""
+
+    loaded = load_yaml(INPUT3)
+
+    assert _collect_container_types(loaded) == {dict, list}
+
+    assert loaded["alias"] is not loaded["base"]
+    assert loaded["merged"]["list"] is not loaded["base"]["list"]
+
+    # Quoting is kept, merge keys are resolved (like by the "safe" engine)
+    assert dump_yaml_into_str(loaded).strip() == OUTPUT4.strip()
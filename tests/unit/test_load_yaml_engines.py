@@ -0,0 +1,78 @@
+"""Parity testing of the "load_yaml" function engines ("rt" and "safe")."""
+
+import ast
+import json
+import pathlib
+import pytest
+from azepi._helpers import load_yaml
+
+
+TESTS_DIR = pathlib.Path(__file__).resolve().parent.parent
+
+
+def _collect_fixtures():
+    """Find all module-level string constants in unit and integration tests."""
+
+    fixtures = []
+
+    for path in sorted(TESTS_DIR.glob("*/test_*.py")):
+        tree = ast.parse(path.read_text())
+
+        for node in tree.body:
+            if not isinstance(node, ast.Assign):
+                continue
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                continue
+            if not isinstance(value, (str, bytes)):
+                continue
+
+            for target in node.targets:
+                fixtures.append(pytest.param(
+                    value,
+                    id=f"{path.parent.name}/{path.stem}:{target.id}",
+                ))
+
+    return fixtures
+
+
+def _load(path_or_str, engine):
+    try:
+        return load_yaml(path_or_str, engine=engine)
+    except Exception as error:  # pylint: disable=broad-except
+        return type(error)
+
+
+def _embedded_configs(something):
+    """Find Epiphany configs embedded in module sections (the "config" key)."""
+
+    if not isinstance(something, dict):
+        return []
+
+    return [
+        value["config"]
+        for value in something.values()
+        if isinstance(value, dict) and isinstance(value.get("config"), str)
+    ]
+
+
+@pytest.mark.parametrize("fixture", _collect_fixtures())
+def test_load_yaml_engines_parity(fixture):
+    """Both engines must produce identical python structures."""
+
+    loaded_rt = _load(fixture, "rt")
+    loaded_safe = _load(fixture, "safe")
+
+    if isinstance(loaded_rt, type) or isinstance(loaded_safe, type):
+        # Invalid yaml must be rejected by both engines
+        assert isinstance(loaded_rt, type) and isinstance(loaded_safe, type)
+        return
+
+    assert loaded_rt == loaded_safe
+
+    # Compare key order and (base) types too
+    assert json.dumps(loaded_rt, default=str) == json.dumps(loaded_safe, default=str)
+
+    for config in _embedded_configs(loaded_rt):
+        test_load_yaml_engines_parity(config)
@@ -0,0 +1,134 @@
+"""Unit testing of the "ModuleContext" class."""
+
+import pytest
+from azepi._context import ModuleContext
+from azepi._state import StaleStateError
+from azepi._helpers import load_yaml
+
+
+STATE = '''
+kind: state
+azbi:
+  status: applied
+azepi:
+  status: initialized
+'''
+
+CONFIG = '''
+kind: azepi-config
+azepi:
+  config: |
+    kind: epiphany-cluster
+    name: azepi
+  vault_password: "asd"
+'''
+
+OUTPUT = {
+    "kind": "state",
+    "azbi": {
+        "status": "applied",
+        "size": 2,
+    },
+    "azepi": {
+        "status": "applied",
+    },
+}
+
+
+def _create_context(shared_dir):
+    (shared_dir / "azepi").mkdir()
+
+    with (shared_dir / "state.yml").open("w") as stream:
+        stream.write(STATE)
+
+    with (shared_dir / "azepi" / "azepi-config.yml").open("w") as stream:
+        stream.write(CONFIG)
+
+    return ModuleContext({
+        "M_SHARED": str(shared_dir),
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+    })
+
+
+def test_module_context_accessors(tmp_path):
+    """Unit test for the "ModuleContext" class (paths and accessors)."""
+
+    v = _create_context(tmp_path)
+
+    assert v["state_file"] == tmp_path / "state.yml"
+
+    assert v.module_state == {"status": "initialized"}
+
+    assert v.upstream("azbi") == {"status": "applied"}
+
+    assert v.module_config["vault_password"] == "asd"
+
+    # Index is built while parsing (before the documents are loaded as a list)
+    assert v.document_index.first("epiphany-cluster")["name"] == "azepi"
+
+    assert v.epiphany_documents == [{"kind": "epiphany-cluster", "name": "azepi"}]
+
+
+def test_module_context_flush(tmp_path):
+    """Unit test for the "ModuleContext" class (only touched sections are written)."""
+
+    v = _create_context(tmp_path)
+
+    v.update_state({"azepi": {"status": "applied"}})
+
+    # Simulate other module updating its own section in the meantime
+    with (tmp_path / "state.yml").open("w") as stream:
+        stream.write(STATE.replace("status: applied", "status: applied\n  size: 2"))
+
+    v.flush()
+
+    assert load_yaml(tmp_path / "state.yml") == OUTPUT
+
+
+def test_module_context_flush_detects_stale_state(tmp_path):
+    """Unit test for the "ModuleContext" class (concurrent updates are not lost)."""
+
+    v = _create_context(tmp_path)
+
+    v.update_state({"azepi": {"status": "applied"}})
+
+    # Simulate other invocation of this module updating the state in the meantime
+    with (tmp_path / "state.yml").open("w") as stream:
+        stream.write(STATE.replace("status: initialized", "status: destroyed"))
+
+    with pytest.raises(StaleStateError):
+        v.flush()
+
+    assert "status: destroyed" in (tmp_path / "state.yml").read_text()
+
+
+def test_module_context_flush_in_parallel(tmp_path):
+    """Unit test for the "ModuleContext" class (modules starting with a fresh state)."""
+
+    contexts = [
+        ModuleContext({
+            "M_SHARED": str(tmp_path),
+            "M_MODULE_SHORT": name,
+            "M_CONFIG_NAME": f"{name}-config.yml",
+            "M_STATE_FILE_NAME": "state.yml",
+        })
+        for name in ["azbi", "azepi"]
+    ]
+
+    # Both read the (missing) state before any of them writes
+    for v in contexts:
+        assert v.state_content == b""
+
+    for v in contexts:
+        v.update_state({"kind": "state", v.module_short: {"status": "initialized"}})
+
+    for v in contexts:
+        v.flush()
+
+    assert load_yaml(tmp_path / "state.yml") == {
+        "kind": "state",
+        "azbi": {"status": "initialized"},
+        "azepi": {"status": "initialized"},
+    }
@@ -0,0 +1,115 @@
+"""Unit testing of the "_process_machines" function."""
+
+import pytest
+from azepi._context import ModuleContext
+from azepi._helpers import load_yaml
+from azepi._documents import EpiphanyCluster, Component
+from azepi.init import MINIMAL_EPIPHANY_CLUSTER, _get_enabled_components, _process_machines
+
+
+STATE = '''
+kind: state
+azbi:
+  status: applied
+  use_public_ip: false
+  output:
+    private_ips.value: [10.0.0.1, 10.0.0.2, 10.0.0.3]
+    public_ips.value: []
+    vm_names.value: [azbi-0, azbi-1, azbi-2]
+'''
+
+OUTPUT = {
+    "repository": ["default-azbi-0"],
+    "postgresql": ["default-azbi-1"],
+}
+
+
+def _create_context(shared_dir):
+    with (shared_dir / "state.yml").open("w") as stream:
+        stream.write(STATE)
+
+    return ModuleContext({
+        "M_SHARED": str(shared_dir),
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+    })
+
+
+def _create_cluster(counts):
+    cluster = load_yaml(MINIMAL_EPIPHANY_CLUSTER, engine="safe")
+
+    for key, count in counts.items():
+        cluster["specification"]["components"][key]["count"] = count
+
+    return EpiphanyCluster.from_dict(cluster)
+
+
+def test_process_machines(tmp_path):
+    """Unit test for the "_process_machines" function."""
+
+    cluster = _create_cluster({})
+
+    machines, cluster = _process_machines(
+        _create_context(tmp_path), cluster, _get_enabled_components(cluster))
+
+    assert [machine["specification"] for machine in machines] == [
+        {"hostname": "azbi-0", "ip": "10.0.0.1"},
+        {"hostname": "azbi-1", "ip": "10.0.0.2"},
+        {"hostname": "azbi-2", "ip": "10.0.0.3"},
+    ]
+
+    assert {
+        key: value["machines"]
+        for key, value in cluster["specification"]["components"].items()
+        if "machines" in value
+    } == OUTPUT
+
+    assert isinstance(cluster.specification.components["repository"], Component)
+
+
+def test_process_machines_keeps_input(tmp_path):
+    """Unit test for the "_process_machines" function (the input cluster is not changed)."""
+
+    cluster = _create_cluster({})
+
+    _process_machines(_create_context(tmp_path), cluster, _get_enabled_components(cluster))
+
+    assert cluster == _create_cluster({})
+
+
+def test_process_machines_reports_shortfalls(tmp_path):
+    """Unit test for the "_process_machines" function (all shortfalls are reported)."""
+
+    cluster = _create_cluster({"kubernetes_node": 2, "kafka": 3})
+
+    with pytest.raises(Exception) as error:
+        _process_machines(_create_context(tmp_path), cluster, _get_enabled_components(cluster))
+
+    assert str(error.value) == ("not enough vms available: "
+                                "kafka requires 3 (only 0 available); "
+                                "postgresql requires 1 (only 0 available)")
+
+
+def test_process_machines_without_state(tmp_path):
+    """Unit test for the "_process_machines" function (dummy machines)."""
+
+    cluster = _create_cluster({"kubernetes_node": 2})
+
+    machines, cluster = _process_machines(
+        ModuleContext({
+            "M_SHARED": str(tmp_path),
+            "M_MODULE_SHORT": "azepi",
+            "M_CONFIG_NAME": "azepi-config.yml",
+            "M_STATE_FILE_NAME": "state.yml",
+        }),
+        cluster,
+        _get_enabled_components(cluster))
+
+    assert [machine["name"] for machine in machines] == [
+        "default-vm-1", "default-vm-2", "default-vm-3", "default-vm-4",
+    ]
+
+    assert cluster["specification"]["components"]["kubernetes_node"]["machines"] == [
+        "default-vm-2", "default-vm-3",
+    ]
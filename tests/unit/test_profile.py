@@ -0,0 +1,54 @@
+"""Unit testing of the "run_profiled" function."""
+
+import json
+import copy
+from azepi._profile import run_profiled, step
+
+
+VARIABLES = {
+    "M_MODULE_SHORT": "azepi",
+    "M_CONFIG_NAME": "azepi-config.yml",
+    "M_STATE_FILE_NAME": "state.yml",
+}
+
+
+@step
+def _copy_step(something):
+    return copy.deepcopy(something)
+
+
+def _handler(variables):
+    for _ in range(3):
+        _copy_step(variables)
+    return 42
+
+
+def test_run_profiled(tmp_path):
+    """Unit test for the "run_profiled" function (stats and summary are written)."""
+
+    variables = dict(VARIABLES, M_SHARED=str(tmp_path))
+
+    assert run_profiled(_handler, variables, name="init") == 42
+
+    build_dir = tmp_path / "build" / "azepi"
+
+    assert len(list(build_dir.glob("init-*.pstats"))) == 1
+
+    summary = json.loads(next(build_dir.glob("init-*.json")).read_text())
+
+    assert summary["method"] == "init"
+
+    assert summary["steps"]["test_profile._copy_step"]["calls"] == 3
+
+    assert "copy" in summary["categories"]
+
+    assert any(
+        "_copy_step" in function["function"]
+        for function in summary["hot_functions_by_cumulative_time"]
+    )
+
+
+def test_step_without_profiling():
+    """Unit test for the "step" decorator (no-op outside of profiling)."""
+
+    assert _copy_step({"key": "value"}) == {"key": "value"}
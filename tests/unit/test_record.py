@@ -0,0 +1,109 @@
+"""Unit testing of the "Record" class (document records)."""
+
+from azepi._documents import (Machine, MachineSpecification, EpiphanyCluster, Component,
+                              FeatureMapping, ComponentConfig)
+from azepi._helpers import dump_yaml_into_str
+
+
+INPUT = {
+    "kind": "infrastructure/machine",
+    "name": "default-azbi-0",
+    "provider": "any",
+    "specification": {"ip": "10.0.0.1", "hostname": "azbi-0"},
+    "version": "0.9.0",
+}
+
+CLUSTER_INPUT = {
+    "kind": "epiphany-cluster",
+    "name": "azepi",
+    "provider": "any",
+    "specification": {
+        "name": "azepi",
+        "components": {
+            "repository": {"count": 1, "machines": ["default-azbi-0"]},
+            "kafka": {"count": 0, "unknown": True},
+        },
+        "unknown": {"a": 1},
+    },
+    "title": "Epiphany cluster Config",
+}
+
+FEATURE_MAPPING_INPUT = {
+    "kind": "configuration/feature-mapping",
+    "name": "azepi",
+    "specification": {"roles_mapping": {"repository": ["repository"]}},
+}
+
+COMPONENT_CONFIG_INPUT = {
+    "kind": "configuration/postgresql",
+    "specification": {"extensions": {}},
+}
+
+
+def test_machine_from_dict():
+    """Unit test for the "from_dict" method of document records (lossless, order is kept)."""
+
+    machine = Machine.from_dict(INPUT)
+
+    assert machine.to_dict() == INPUT
+
+    assert list(machine.to_dict()) == list(INPUT)
+
+    specification = machine["specification"]
+
+    assert isinstance(specification, MachineSpecification)
+    assert (specification.hostname, specification.ip) == ("azbi-0", "10.0.0.1")
+    assert machine.extra == {"version": "0.9.0"}
+    assert machine["specification"]["ip"] == "10.0.0.1"
+    assert machine.get("title") is None
+
+    # Records are written out as the mappings they stand for
+    assert dump_yaml_into_str([machine, specification]) == \
+        dump_yaml_into_str([INPUT, INPUT["specification"]])
+
+
+def test_machine_copy():
+    """Unit test for the "copy" method of document records."""
+
+    machine = Machine.from_dict(INPUT)
+
+    other = machine.copy(name="default-azbi-1",
+                         specification=machine["specification"].copy(ip="10.0.0.2"),
+                         title="Machine")
+
+    assert other == dict(INPUT, name="default-azbi-1",
+                         specification={"ip": "10.0.0.2", "hostname": "azbi-0"},
+                         title="Machine")
+
+    assert list(other) == ["kind", "name", "provider", "specification", "version", "title"]
+
+    # The original is not changed
+    assert machine == INPUT
+
+
+def test_record_of_other_documents():
+    """Unit test for records of cluster, feature mapping and component config documents."""
+
+    documents = [
+        EpiphanyCluster.from_dict(CLUSTER_INPUT),
+        FeatureMapping.from_dict(FEATURE_MAPPING_INPUT),
+        ComponentConfig.from_dict(COMPONENT_CONFIG_INPUT),
+    ]
+
+    inputs = [CLUSTER_INPUT, FEATURE_MAPPING_INPUT, COMPONENT_CONFIG_INPUT]
+
+    assert [document.to_dict() for document in documents] == inputs
+
+    assert [list(document.to_dict()) for document in documents] == [
+        list(document) for document in inputs
+    ]
+
+    specification = documents[0]["specification"]
+
+    assert isinstance(specification.components["repository"], Component)
+    assert specification.components["kafka"].extra == {"unknown": True}
+    assert specification.extra == {"unknown": {"a": 1}}
+
+    assert documents[1]["specification"].roles_mapping == {"repository": ["repository"]}
+
+    assert dump_yaml_into_str(documents) == dump_yaml_into_str(inputs)
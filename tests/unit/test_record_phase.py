@@ -0,0 +1,95 @@
+"""Unit testing of the "record_phase" function."""
+
+import pytest
+from azepi._context import ModuleContext
+from azepi._metrics import record_phase, record_documents, set_gauge
+
+
+DOCUMENTS = [
+    {"kind": "epiphany-cluster", "name": "azepi"},
+    {"kind": "infrastructure/machine", "name": "default-azbi-0"},
+    {"kind": "infrastructure/machine", "name": "default-azbi-1"},
+]
+
+
+def _create_context(shared_dir, **variables):
+    return ModuleContext(dict({
+        "M_SHARED": str(shared_dir),
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+    }, **variables))
+
+
+def _read_samples(metrics_file, environment):
+    """Read samples of the file (all of them labelled with the environment)."""
+
+    samples = {}
+
+    for line in metrics_file.read_text().splitlines():
+        if line.startswith("#"):
+            continue
+
+        name, value = line.rsplit(" ", 1)
+
+        label = f'environment="{environment}",'
+        assert label in name
+
+        samples[name.replace(label, "")] = value
+
+    return samples
+
+
+def test_record_phase(tmp_path):
+    """Unit test for the "record_phase" function (metrics are cumulative over runs)."""
+
+    v = _create_context(tmp_path)
+
+    with record_phase(v, "apply"):
+        record_documents(v, DOCUMENTS)
+        set_gauge(v, "azepi_apply_skipped", 0)
+
+    v = _create_context(tmp_path)
+
+    with pytest.raises(RuntimeError):
+        with record_phase(v, "apply"):
+            record_documents(v, DOCUMENTS[:1])
+            raise RuntimeError("failure")
+
+    samples = _read_samples(tmp_path / "metrics" / "azepi.prom", str(tmp_path))
+
+    assert samples['azepi_phase_duration_seconds_count{module="azepi",phase="apply"}'] == "2"
+    assert samples['azepi_phase_duration_seconds_bucket'
+                   '{module="azepi",phase="apply",le="+Inf"}'] == "2"
+
+    assert samples['azepi_phase_runs_total'
+                   '{module="azepi",phase="apply",result="success"}'] == "1"
+    assert samples['azepi_phase_runs_total'
+                   '{module="azepi",phase="apply",result="failure"}'] == "1"
+
+    # Gauges keep their last value, document counts are replaced as a whole
+    assert samples['azepi_apply_skipped{module="azepi"}'] == "0"
+    assert samples['azepi_vms{module="azepi"}'] == "0"
+    assert samples['azepi_documents{kind="epiphany-cluster",module="azepi"}'] == "1"
+    assert 'azepi_documents{kind="infrastructure/machine",module="azepi"}' not in samples
+
+
+def test_record_phase_in_shared_metrics_dir(tmp_path):
+    """Unit test for the "record_phase" function (environments do not overwrite each other)."""
+
+    metrics_dir = tmp_path / "collector"
+
+    for name in ["a", "b"]:
+        shared_dir = tmp_path / name / "shared"
+
+        v = _create_context(shared_dir, M_METRICS_DIR=str(metrics_dir), M_ENVIRONMENT=f"env-{name}")
+
+        with record_phase(v, "plan"):
+            record_documents(v, DOCUMENTS[:2 if name == "a" else 3])
+
+    files = sorted(metrics_dir.iterdir())
+
+    assert [path.name[:len("azepi-env-a-")] for path in files] == ["azepi-env-a-", "azepi-env-b-"]
+
+    assert _read_samples(files[0], "env-a")['azepi_vms{module="azepi"}'] == "1"
+    assert _read_samples(files[1], "env-b")['azepi_vms{module="azepi"}'] == "2"
@@ -0,0 +1,50 @@
+"""Unit testing of the "_render_diff" function."""
+
+from azepi._context import ModuleContext
+from azepi.plan import _render_diff
+
+
+STATE = '''
+kind: state
+azepi:
+  status: initialized
+'''
+
+CONFIG = '''
+kind: azepi-config
+azepi:
+  config: |
+    kind: epiphany-cluster
+    name: azepi
+  vault_password: "asd"
+'''
+
+OUTPUT = '''
+@@ -1 +1,4 @@
+-{}
++config: |
++  kind: epiphany-cluster
++  name: azepi
++vault_password: "asd"
+'''
+
+
+def test_render_diff(tmp_path):
+    """Unit test for the "_render_diff" function (quoting and literal blocks are kept)."""
+
+    (tmp_path / "azepi").mkdir()
+
+    with (tmp_path / "state.yml").open("w") as stream:
+        stream.write(STATE)
+
+    with (tmp_path / "azepi" / "azepi-config.yml").open("w") as stream:
+        stream.write(CONFIG)
+
+    v = ModuleContext({
+        "M_SHARED": str(tmp_path),
+        "M_MODULE_SHORT": "azepi",
+        "M_CONFIG_NAME": "azepi-config.yml",
+        "M_STATE_FILE_NAME": "state.yml",
+    })
+
+    assert _render_diff(v) == OUTPUT.strip()
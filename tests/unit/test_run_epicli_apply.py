@@ -0,0 +1,112 @@
+"""Unit testing of the "_run_epicli_apply" function."""
+
+import os
+import subprocess
+import pytest
+from azepi._context import ModuleContext
+from azepi.apply import _run_epicli_apply
+
+
+CONFIG = '''
+kind: azepi-config
+azepi:
+  config: |
+    kind: epiphany-cluster
+    name: azepi
+    ---
+    kind: configuration/postgresql
+    name: default
+    ---
+    kind: configuration/applications
+    name: default
+  vault_password: "asd"
+'''
+
+# Records arguments and the config of every run, fails as told by EPICLI_FAILURE
+EPICLI = '''#!/bin/sh
+echo "$@" >> "$EPICLI_CALLS"
+for argument in "$@"; do
+  case "$argument" in --file=*) grep -c '^kind:' "${argument#--file=}" >> "$EPICLI_CALLS";; esac
+done
+case "$EPICLI_FAILURE" in
+  option) case "$*" in *--ansible-tags*)
+    echo "epicli: error: unrecognized arguments: --ansible-tags=postgresql" >&2; exit 2;; esac;;
+  ansible) echo "fatal: [azbi-0]: FAILED!" >&2; exit 1;;
+esac
+'''
+
+SCOPE = {
+    "full": False,
+    "documents": ["configuration/postgresql/default"],
+    "tags": ["postgresql"],
+}
+
+
+@pytest.fixture(name="run")
+def fixture_run(tmp_path, monkeypatch):
+    """Run "_run_epicli_apply" with a stub epicli, return its calls (tags, documents)."""
+
+    (tmp_path / "bin").mkdir()
+    (tmp_path / "bin" / "epicli").write_text(EPICLI)
+    (tmp_path / "bin" / "epicli").chmod(0o755)
+
+    (tmp_path / "azepi").mkdir()
+    (tmp_path / "azepi" / "azepi-config.yml").write_text(CONFIG)
+
+    monkeypatch.setenv("PATH", str(tmp_path / "bin") + os.pathsep + os.environ["PATH"])
+
+    def run(scope, failure="", **variables):
+        calls = tmp_path / f"calls-{len(list(tmp_path.glob('calls-*')))}.txt"
+
+        monkeypatch.setenv("EPICLI_CALLS", str(calls))
+        monkeypatch.setenv("EPICLI_FAILURE", failure)
+
+        v = ModuleContext(dict({
+            "M_SHARED": str(tmp_path),
+            "M_MODULE_SHORT": "azepi",
+            "M_CONFIG_NAME": "azepi-config.yml",
+            "M_STATE_FILE_NAME": "state.yml",
+        }, **variables))
+
+        error = None
+
+        try:
+            _run_epicli_apply(v, scope)
+        except subprocess.CalledProcessError as raised:
+            error = raised
+
+        lines = calls.read_text().splitlines()
+
+        # Every environment gets its own build dir
+        assert all(f"--output={tmp_path} " in arguments for arguments in lines[::2])
+
+        return [
+            (arguments.rsplit("=", 1)[1] if "--ansible-tags=" in arguments else None, int(kinds))
+            for arguments, kinds in zip(lines[::2], lines[1::2])
+        ], error
+
+    return run
+
+
+def test_run_epicli_apply(run):
+    """Unit test for the "_run_epicli_apply" function (scoped apply is opt-in)."""
+
+    assert run(SCOPE) == ([(None, 3)], None)
+
+    assert run(dict(SCOPE, full=True), M_SCOPED_APPLY="1") == ([(None, 3)], None)
+
+    # All documents are passed, not only the changed ones
+    assert run(SCOPE, M_SCOPED_APPLY="1") == ([("postgresql", 3)], None)
+
+
+def test_run_epicli_apply_fallback(run):
+    """Unit test for the "_run_epicli_apply" function (only rejected tags fall back)."""
+
+    assert run(SCOPE, "option", M_SCOPED_APPLY="1") == ([("postgresql", 3), (None, 3)], None)
+
+    # Real failures are not retried as a full apply
+    calls, error = run(SCOPE, "ansible", M_SCOPED_APPLY="1")
+
+    assert calls == [("postgresql", 3)]
+
+    assert error.returncode == 1
@@ -0,0 +1,122 @@
+"""Unit testing of the "run_streaming" function."""
+
+import os
+import sys
+import time
+import pathlib
+import subprocess
+import pytest
+from azepi._streaming import run_streaming
+
+
+RESOURCES_DIR = pathlib.Path(__file__).resolve().parent.parent.parent / "resources"
+
+# Errors of transports closed after the loop are only printed (not raised)
+TIMEOUT_IN_CHILD = '''
+import gc, subprocess
+from azepi._streaming import run_streaming
+try:
+    run_streaming("echo started; sleep 30", timeout=0.2)
+except subprocess.TimeoutExpired:
+    pass
+gc.collect()
+'''
+
+
+def test_run_streaming(tmp_path, capsys):
+    """Unit test for the "run_streaming" function (output is streamed and logged)."""
+
+    log_file = tmp_path / "logs" / "output.log"
+
+    assert run_streaming("echo line1; echo line2 >&2; printf line3",
+                         log_file=log_file) == 0
+
+    captured = capsys.readouterr()
+
+    assert captured.out == "line1\nline3\n"
+    assert captured.err == "line2\n"
+
+    # Lines of both streams are interleaved in the log
+    assert sorted(line.split(" ", 2)[2] for line in log_file.read_text().splitlines()) == [
+        "stderr line2",
+        "stdout line1",
+        "stdout line3",
+    ]
+
+
+def test_run_streaming_without_shell(capsys):
+    """Unit test for the "run_streaming" function (arguments are not interpreted)."""
+
+    run_streaming(["echo", "a'b", "$HOME"])
+
+    assert capsys.readouterr().out == "a'b $HOME\n"
+
+
+def test_run_streaming_failure():
+    """Unit test for the "run_streaming" function (non-zero exit code)."""
+
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run_streaming("exit 3")
+
+    assert error.value.returncode == 3
+
+
+def test_run_streaming_failure_stderr():
+    """Unit test for the "run_streaming" function (last lines of stderr are attached)."""
+
+    with pytest.raises(subprocess.CalledProcessError) as error:
+        run_streaming("for i in $(seq 100); do echo error $i >&2; done; echo out; exit 2")
+
+    assert error.value.stderr.splitlines() == [f"error {i}" for i in range(81, 101)]
+
+
+def test_run_streaming_timeout():
+    """Unit test for the "run_streaming" function (overall deadline)."""
+
+    started = time.monotonic()
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_streaming("while true; do echo tick; sleep 0.05; done", timeout=0.5)
+
+    assert time.monotonic() - started < 5
+
+
+def test_run_streaming_silence_timeout():
+    """Unit test for the "run_streaming" function (no output for too long)."""
+
+    started = time.monotonic()
+
+    with pytest.raises(subprocess.TimeoutExpired) as error:
+        run_streaming("echo started; sleep 30",
+                      timeout=60,
+                      silence_timeout=0.5)
+
+    assert error.value.timeout == 0.5
+
+    assert time.monotonic() - started < 5
+
+
+def test_run_streaming_kills_process_group(tmp_path):
+    """Unit test for the "run_streaming" function (SIGTERM is escalated to SIGKILL)."""
+
+    marker = tmp_path / "survived"
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_streaming(f"trap '' TERM; (trap '' TERM; sleep 1; touch {marker}) & wait",
+                      timeout=0.2,
+                      kill_grace=0.2)
+
+    time.sleep(1.5)
+
+    assert not marker.exists()
+
+
+def test_run_streaming_timeout_closes_transports():
+    """Unit test for the "run_streaming" function (nothing is left open after a timeout)."""
+
+    result = subprocess.run([sys.executable, "-X", "dev", "-c", TIMEOUT_IN_CHILD],
+                            env=dict(os.environ, PYTHONPATH=str(RESOURCES_DIR)),
+                            check=True,
+                            stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    assert result.stderr.decode("utf-8") == ""
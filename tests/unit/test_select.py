@@ -60,3 +60,13 @@ def test_select_with_query():
     assert select(INPUT, q_kind("kind1"), exactly=2) == OUTPUT2
 
     assert select(INPUT, q_kind("kind1"), exactly=3) is None
+
+
+def test_select_with_iterator():
+    """Unit test for the "select" function (iterables are consumed lazily)."""
+
+    def documents():
+        yield from INPUT
+        raise AssertionError("must not be reached")
+
+    assert select(documents(), q_kind("kind1"), exactly=2) == OUTPUT2
@@ -0,0 +1,65 @@
+"""Unit testing of the "serve" method (and its client)."""
+
+import threading
+import socketserver
+from azepi import _client
+from azepi.serve import _execute, _RequestHandler
+
+
+VARIABLES = {
+    "M_VERSION": "0.0.0",
+    "M_MODULE_SHORT": "azepi",
+}
+
+OUTPUT = '''labels:
+  version: 0.0.0
+  name: Generic Epiphany on AKS
+  short: azepi
+  kind: epiphany
+  provider: azure
+'''
+
+
+def test_execute():
+    """Unit test for the "_execute" function (output and failures are captured)."""
+
+    assert _execute({"method": "metadata", "variables": VARIABLES}) == {
+        "stdout": OUTPUT,
+        "stderr": "",
+        "result": None,
+        "error": None,
+    }
+
+    response = _execute({"method": "plan", "variables": VARIABLES})
+
+    assert response["error"].splitlines()[-1] == "KeyError: 'M_SHARED'"
+
+    response = _execute({"method": "apply", "variables": VARIABLES})
+
+    assert response["error"] == "unsupported method: apply\n"
+
+
+def test_request(tmp_path, capsys):
+    """Unit test for the "request" and "replay" functions."""
+
+    socket_path = str(tmp_path / "serve.sock")
+
+    # No daemon listening (the caller runs the method in-process)
+    assert _client.request(socket_path, "metadata", VARIABLES) is None
+
+    server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+
+    try:
+        response = _client.request(socket_path, "metadata", VARIABLES)
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+    capsys.readouterr()
+
+    assert _client.replay(response) is None
+
+    assert capsys.readouterr().out == OUTPUT
@@ -0,0 +1,157 @@
+"""Cold start (imported modules) of the entrypoint subcommands.
+
+Checks are based on lists of imported modules, not on elapsed time (see
+tests/benchmarks/test_startup_time.py for that).
+"""
+
+import os
+import sys
+import pathlib
+import subprocess
+from azepi._helpers import dump_yaml
+
+
+ROOT_DIR = pathlib.Path(__file__).resolve().parent.parent.parent
+
+ENTRYPOINT = ROOT_DIR / "workdir" / "entrypoint.py"
+
+# Modules that must not be imported by cheap subcommands
+HEAVY_MODULES = {"ruamel.yaml", "concurrent.futures", "subprocess"}
+
+# Modules handling the subcommands (each imports only its own one)
+HANDLERS = ["metadata", "init", "plan", "apply", "plan_destroy", "destroy", "fleet", "serve"]
+
+# Other handler modules that the handler modules depend on
+HANDLER_DEPENDENCIES = {
+    "apply": {"azepi.plan"},
+    "fleet": {"azepi.plan"},
+}
+
+# Modules imported with "importlib" (i.e. handlers) are missing in reports of
+# "-X importtime", so sys.modules is listed when the process exits
+LIST_MODULES = '''
+import os, sys, runpy
+sys.argv.pop(0)
+try:
+    if sys.argv[0].endswith(".py"):
+        runpy.run_path(sys.argv[0], run_name="__main__")
+    else:
+        __import__(sys.argv[0])
+finally:
+    with open(os.environ["MODULES_FILE"], "w") as stream:
+        stream.write("\\n".join(sys.modules))
+'''
+
+STATE = {
+    "kind": "state",
+    "azepi": {
+        "status": "applied",
+        "config": "kind: epiphany-cluster\n",
+    },
+}
+
+CONFIG = {
+    "kind": "azepi-config",
+    "azepi": {
+        "config": "kind: epiphany-cluster\n",
+    },
+}
+
+
+def _get_imported_modules(arguments, shared_dir, **variables):
+    """Run a script (or import a module), return names of all modules it imported."""
+
+    modules_file = shared_dir / "modules.txt"
+
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(ROOT_DIR / "resources"),
+        M_VERSION="0.0.0",
+        M_MODULE_SHORT="azepi",
+        M_CONFIG_NAME="azepi-config.yml",
+        M_STATE_FILE_NAME="state.yml",
+        M_SHARED=str(shared_dir),
+        MODULES_FILE=str(modules_file),
+        **variables,
+    )
+
+    subprocess.run([sys.executable, "-c", LIST_MODULES, *arguments],
+                   env=env, check=True,
+                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    return set(modules_file.read_text().splitlines())
+
+
+def _create_shared_dir(shared_dir):
+    (shared_dir / "azepi").mkdir()
+
+    with (shared_dir / "state.yml").open("w") as stream:
+        dump_yaml(STATE, stream=stream)
+
+    with (shared_dir / "azepi" / "azepi-config.yml").open("w") as stream:
+        dump_yaml(CONFIG, stream=stream)
+
+
+def test_startup_metadata(tmp_path):
+    """The "metadata" subcommand must not import any lifecycle machinery."""
+
+    modules = _get_imported_modules([str(ENTRYPOINT), "metadata"], tmp_path)
+
+    assert not HEAVY_MODULES & modules
+
+    assert "azepi._helpers" not in modules
+
+
+def test_startup_metadata_with_server_socket(tmp_path):
+    """The "metadata" subcommand only adds the thin client when a daemon is configured."""
+
+    modules = _get_imported_modules([str(ENTRYPOINT), "metadata"], tmp_path,
+                                    M_SERVER_SOCKET=str(tmp_path / "missing.sock"))
+
+    assert "azepi._client" in modules
+
+    assert not HEAVY_MODULES & modules
+
+    assert "azepi._helpers" not in modules
+
+
+def test_startup_plan_without_changes(tmp_path):
+    """The "plan" subcommand must not parse anything when inputs did not change."""
+
+    _create_shared_dir(tmp_path)
+
+    # The first run computes the plan
+    _get_imported_modules([str(ENTRYPOINT), "plan"], tmp_path)
+
+    modules = _get_imported_modules([str(ENTRYPOINT), "plan"], tmp_path)
+
+    assert not HEAVY_MODULES & modules
+
+    assert "azepi.apply" not in modules
+
+
+def test_startup_apply_without_plan(tmp_path):
+    """The "apply" subcommand must not parse anything when there is nothing to apply."""
+
+    _create_shared_dir(tmp_path)
+
+    modules = _get_imported_modules([str(ENTRYPOINT), "apply"], tmp_path)
+
+    assert not {"ruamel.yaml", "asyncio", "concurrent.futures"} & modules
+
+    assert "azepi.init" not in modules
+
+
+def test_startup_handlers(tmp_path):
+    """Handler modules import yaml parsers lazily and no other handlers."""
+
+    for name in HANDLERS:
+        modules = _get_imported_modules([f"azepi.{name}"], tmp_path)
+
+        assert "ruamel.yaml" not in modules, name
+
+        assert {
+            f"azepi.{other}"
+            for other in HANDLERS
+            if other != name
+        } & modules == HANDLER_DEPENDENCIES.get(name, set()), name
@@ -0,0 +1,64 @@
+"""Unit testing of the "state_lock" function."""
+
+import time
+import threading
+import pytest
+from azepi._state import StateLockTimeout, state_lock, read_state_file, update_state_file
+
+
+def test_state_lock_shared(tmp_path):
+    """Unit test for the "state_lock" function (readers do not block each other)."""
+
+    path = tmp_path / "state.yml"
+
+    with state_lock(path):
+        with state_lock(path, timeout=0):
+            assert (tmp_path / "state.yml.lock").exists()
+
+
+def test_state_lock_timeout(tmp_path):
+    """Unit test for the "state_lock" function (writers exclude readers)."""
+
+    path = tmp_path / "state.yml"
+
+    with state_lock(path, exclusive=True):
+        with pytest.raises(StateLockTimeout):
+            read_state_file(path, timeout=0.1)
+
+        with pytest.raises(StateLockTimeout):
+            update_state_file(path, [{"azepi": {"status": "applied"}}], timeout=0.1)
+
+    assert not path.exists()
+
+
+def test_state_lock_serializes_updates(tmp_path):
+    """Unit test for the "state_lock" function (concurrent updates are not lost)."""
+
+    path = tmp_path / "state.yml"
+
+    def update(name):
+        update_state_file(path, [{name: {"status": "applied"}}])
+
+    with state_lock(path, exclusive=True):
+        threads = [
+            threading.Thread(target=update, args=(name,))
+            for name in ["azbi", "azks", "azepi"]
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Writers wait for the lock
+        time.sleep(0.2)
+        assert not path.exists()
+
+    for thread in threads:
+        thread.join()
+
+    assert sorted(read_state_file(path).decode("utf-8").splitlines()) == [
+        "  status: applied",
+        "  status: applied",
+        "  status: applied",
+        "azbi:",
+        "azepi:",
+        "azks:",
+    ]
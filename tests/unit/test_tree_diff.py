@@ -0,0 +1,65 @@
+"""Unit testing of the "tree_diff" function."""
+
+from azepi._helpers import tree_diff, format_path
+
+
+INPUT1 = {
+    "must-be-unchanged": {
+        "key": [1, 2, 3],
+    },
+    "must-be-changed": {
+        "count": 1,
+    },
+    "must-be-removed": None,
+    "must-be-shorter": [1, 2],
+    "must-be-longer": [1],
+}
+
+INPUT2 = {
+    "must-be-unchanged": {
+        "key": [1, 2, 3],
+    },
+    "must-be-changed": {
+        "count": 2,
+    },
+    "must-be-shorter": [1],
+    "must-be-longer": [1, 2],
+    "must-be-added": None,
+}
+
+OUTPUT = [
+    ("changed", ("must-be-changed", "count"), 1, 2),
+    ("removed", ("must-be-removed",), None, None),
+    ("removed", ("must-be-shorter", 1), 2, None),
+    ("added", ("must-be-longer", 1), None, 2),
+    ("added", ("must-be-added",), None, None),
+]
+
+
+def test_tree_diff():
+    """Unit test for the "tree_diff" function."""
+
+    assert not list(tree_diff(INPUT1, INPUT1))
+
+    assert list(tree_diff(INPUT1, INPUT2)) == OUTPUT
+
+
+def test_tree_diff_of_scalar_types():
+    """Unit test for the "tree_diff" function (equal values of different types)."""
+
+    assert list(tree_diff({"a": 1}, {"a": True})) == [("changed", ("a",), 1, True)]
+
+    assert list(tree_diff([0], [False])) == [("changed", (0,), 0, False)]
+
+    assert list(tree_diff({"a": 1}, {"a": 1.0})) == [("changed", ("a",), 1, 1.0)]
+
+    assert not list(tree_diff({"a": [1, True]}, {"a": [1, True]}))
+
+
+def test_format_path():
+    """Unit test for the "format_path" function."""
+
+    assert format_path(("azepi", "config", "epiphany-cluster/azepi", "count")) == \
+        "azepi.config.epiphany-cluster/azepi.count"
+
+    assert format_path(("key", 0, "name")) == "key[0].name"
@@ -0,0 +1,131 @@
+"""Unit testing of the "update_state_file" function."""
+
+import os
+from azepi._state import update_state_file
+from azepi._helpers import load_yaml
+
+
+INPUT = '''kind: state
+# comment of azbi
+azbi:
+  status:    applied   # odd formatting is kept
+  output:
+    vm_names.value: [azbi-0, azbi-1]
+azepi:
+  status: initialized
+  size: 1
+
+azks:
+  status: applied
+'''
+
+ALIASES = '''kind: state
+azbi:
+  tags: &tags
+    env: dev
+azepi:
+  status: initialized
+  tags: *tags
+'''
+
+UPDATES = [
+    {
+        "kind": "state",
+        "azepi": {
+            "status": "applied",
+        },
+    },
+    {
+        "azepi": {
+            "size": 2,
+        },
+    },
+]
+
+OUTPUT = '''kind: state
+# comment of azbi
+azbi:
+  status:    applied   # odd formatting is kept
+  output:
+    vm_names.value: [azbi-0, azbi-1]
+azepi:
+  status: applied
+  size: 2
+azks:
+  status: applied
+'''
+
+
+def test_update_state_file(tmp_path):
+    """Unit test for the "update_state_file" function (sections are updated in place)."""
+
+    path = tmp_path / "state.yml"
+    path.write_text(INPUT)
+
+    update_state_file(path, UPDATES)
+
+    assert path.read_text() == OUTPUT
+
+
+def test_update_state_file_appends_sections(tmp_path):
+    """Unit test for the "update_state_file" function (missing sections are appended)."""
+
+    path = tmp_path / "state.yml"
+    path.write_text("kind: state\nazbi:\n  status: applied")
+
+    update_state_file(path, UPDATES)
+
+    assert path.read_text() == ("kind: state\nazbi:\n  status: applied\n"
+                                "azepi:\n  status: applied\n  size: 2\n")
+
+
+def test_update_state_file_creates_file(tmp_path):
+    """Unit test for the "update_state_file" function (there is no state file yet)."""
+
+    path = tmp_path / "state.yml"
+
+    update_state_file(path, UPDATES)
+
+    assert path.read_text() == "kind: state\nazepi:\n  status: applied\n  size: 2\n"
+
+
+def test_update_state_file_rewrites_unrecognized_layout(tmp_path):
+    """Unit test for the "update_state_file" function (fallback to a full rewrite)."""
+
+    path = tmp_path / "state.yml"
+    path.write_text("---\n" + INPUT)
+
+    update_state_file(path, UPDATES)
+
+    assert load_yaml(path, engine="safe") == load_yaml(OUTPUT, engine="safe")
+
+
+def test_update_state_file_without_changes(tmp_path):
+    """Unit test for the "update_state_file" function (file is not rewritten)."""
+
+    path = tmp_path / "state.yml"
+    path.write_text(INPUT)
+
+    os.utime(path, ns=(0, 0))
+
+    assert update_state_file(path, [{"azks": {"status": "applied"}}]) == INPUT
+
+    assert path.stat().st_mtime_ns == 0
+
+
+def test_update_state_file_with_aliases_across_sections(tmp_path):
+    """Unit test for the "update_state_file" function (fallback to a full rewrite)."""
+
+    path = tmp_path / "state.yml"
+
+    for key in ["azepi", "azbi"]:
+        path.write_text(ALIASES)
+
+        update_state_file(path, [{key: {"status": "applied"}}])
+
+        state = load_yaml(path, engine="safe")
+
+        assert state[key]["status"] == "applied"
+
+        # Both the anchor and the alias are resolved (no dangling references)
+        assert state["azbi"]["tags"] == state["azepi"]["tags"] == {"env": "dev"}
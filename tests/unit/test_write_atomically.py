@@ -0,0 +1,40 @@
+"""Unit testing of the "write_atomically" function."""
+
+from azepi._helpers import write_atomically, load_yaml
+
+
+def test_write_atomically(tmp_path):
+    """Unit test for the "write_atomically" function."""
+
+    path = tmp_path / "directory" / "file.yml"
+
+    write_atomically(path, "key: value\n")
+
+    assert path.read_bytes() == b"key: value\n"
+
+    assert [item.name for item in path.parent.iterdir()] == ["file.yml"]
+
+
+def test_write_atomically_preserves_mode(tmp_path):
+    """Unit test for the "write_atomically" function (permissions are kept)."""
+
+    path = tmp_path / "file.yml"
+    path.write_text("key: value\n")
+    path.chmod(0o640)
+
+    write_atomically(path, b"key: other\n")
+
+    assert path.stat().st_mode & 0o777 == 0o640
+
+
+def test_write_atomically_invalidates_cache(tmp_path):
+    """Unit test for the "write_atomically" function (cached parse is dropped)."""
+
+    path = tmp_path / "file.yml"
+    path.write_text("key: value\n")
+
+    assert load_yaml(path) == {"key": "value"}
+
+    write_atomically(path, "key: other\n")
+
+    assert load_yaml(path) == {"key": "other"}
@@ -0,0 +1,25 @@
+"""Unit testing of the "write_if_changed" function."""
+
+import os
+from azepi._helpers import write_if_changed
+
+
+def test_write_if_changed(tmp_path):
+    """Unit test for the "write_if_changed" function (identical writes are skipped)."""
+
+    path = tmp_path / "directory" / "kubeconfig"
+
+    assert write_if_changed(path, "kind: Config\n")
+
+    os.utime(path, ns=(0, 0))
+
+    assert not write_if_changed(path, b"kind: Config\n")
+
+    assert path.stat().st_mtime_ns == 0
+
+    # Same size, different content
+    assert write_if_changed(path, "kind: Other\n\n")
+
+    assert path.read_bytes() == b"kind: Other\n\n"
+
+    assert path.stat().st_mtime_ns != 0
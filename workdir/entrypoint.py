@@ -3,44 +3,89 @@
 import os
 import sys
 import argparse
-import azepi
+import importlib
 
 
 def _add_metadata_parser(subparsers):
     parser = subparsers.add_parser("metadata")
-    parser.set_defaults(handler=azepi.metadata.main)
+    parser.set_defaults(handler="metadata")
 
 
 def _add_init_parser(subparsers):
     parser = subparsers.add_parser("init")
     parser.add_argument("variables", metavar='KEY=VALUE', type=str, nargs="+")
-    parser.set_defaults(handler=azepi.init.main)
+    parser.set_defaults(handler="init")
 
 
 def _add_plan_parser(subparsers):
     parser = subparsers.add_parser("plan")
-    parser.set_defaults(handler=azepi.plan.main)
+    parser.set_defaults(handler="plan")
 
 
 def _add_apply_parser(subparsers):
     parser = subparsers.add_parser("apply")
-    parser.set_defaults(handler=azepi.apply.main)
+    parser.set_defaults(handler="apply")
 
 
 def _add_plan_destroy_parser(subparsers):
     parser = subparsers.add_parser("plan-destroy")
-    parser.set_defaults(handler=azepi.plan_destroy.main)
+    parser.set_defaults(handler="plan_destroy")
 
 
 def _add_destroy_parser(subparsers):
     parser = subparsers.add_parser("destroy")
-    parser.set_defaults(handler=azepi.destroy.main)
+    parser.set_defaults(handler="destroy")
+
+
+def _add_fleet_parser(subparsers):
+    parser = subparsers.add_parser("fleet")
+    parser.add_argument("shared_dirs", metavar="SHARED_DIR", type=str, nargs="+",
+                        help="shared dirs or glob patterns")
+    parser.add_argument("--apply", action="store_true",
+                        help="apply environments with changes after planning")
+    parser.add_argument("--jobs", type=int,
+                        help="number of environments planned concurrently")
+    parser.add_argument("--apply-jobs", type=int,
+                        help="number of environments applied concurrently")
+    parser.set_defaults(handler="fleet")
+
+
+def _add_serve_parser(subparsers):
+    parser = subparsers.add_parser("serve")
+    parser.set_defaults(handler="serve")
+
+
+def _get_fleet_variables(arguments):
+    """Convert "fleet" arguments to variables."""
+
+    if arguments.handler != "fleet":
+        return []
+
+    variables = [("M_FLEET_SHARED_DIRS", os.pathsep.join(arguments.shared_dirs))]
+
+    if arguments.apply:
+        variables.append(("M_FLEET_APPLY", "1"))
+
+    if arguments.jobs is not None:
+        variables.append(("M_FLEET_JOBS", str(arguments.jobs)))
+
+    if arguments.apply_jobs is not None:
+        variables.append(("M_FLEET_APPLY_JOBS", str(arguments.apply_jobs)))
+
+    return variables
+
+
+def _load_handler(name):
+    """Import lifecycle module only when its subcommand is used."""
+    return importlib.import_module("azepi." + name).main
 
 
 def main():
     """Module's entrypoint"""
 
     parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true",
+                        help="profile the method (same as M_PROFILE=1)")
 
     subparsers = parser.add_subparsers(dest="command")
     _add_metadata_parser(subparsers)
@@ -49,6 +94,8 @@ def main():
     _add_apply_parser(subparsers)
     _add_plan_destroy_parser(subparsers)
     _add_destroy_parser(subparsers)
+    _add_fleet_parser(subparsers)
+    _add_serve_parser(subparsers)
 
     arguments = parser.parse_args()
 
@@ -62,10 +109,27 @@ def main():
             variable.split("=", maxsplit=1)
             for variable in getattr(arguments, "variables", [])
             if "=" in variable
-        ]
+        ] + _get_fleet_variables(arguments)
     )
 
-    return arguments.handler(variables)
+    profiling = arguments.profile or variables.get("M_PROFILE", "").lower() in {"1", "true", "yes"}
+
+    # Let the warm daemon run the method (if there is one listening)
+    if "M_SERVER_SOCKET" in variables and arguments.handler != "serve" and not profiling:
+        client = importlib.import_module("azepi._client")
+        if arguments.handler in client.SERVED_METHODS:
+            response = client.request(variables["M_SERVER_SOCKET"], arguments.handler, variables)
+            if response is not None:
+                return client.replay(response)
+
+    handler = _load_handler(arguments.handler)
+
+    # Profiling support is loaded only when requested (keeps cold start cheap)
+    if profiling:
+        profile = importlib.import_module("azepi._profile")
+        return profile.run_profiled(handler, variables, name=arguments.handler)
+
+    return handler(variables)
 
 
 if __name__ == "__main__":